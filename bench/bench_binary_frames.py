@@ -0,0 +1,46 @@
+# bench/bench_binary_frames.py
+"""
+Size of the realtime binary frame vs. JSON. The round trip through the
+reference decoder is checked in tests/test_binary_protocol.py.
+
+    python -m bench.bench_binary_frames
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from realtime.binary_protocol import encode_samples
+
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def make_samples(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    metrics = ["rt", "rh", "lux"]
+    return [
+        {
+            "metric": metrics[i % 3],
+            "value": round(rnd.uniform(0, 1000), 2),
+            # ~1 Hz per metric with some jitter
+            "timestamp": (start + timedelta(milliseconds=333 * i + rnd.randint(0, 50))).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    print(f"{'samples':>8} {'json/sample':>12} {'json batch':>11} {'bin f32':>8} {'bin f64':>8} {'f32 ratio':>10}")
+    for n in BATCH_SIZES:
+        samples = make_samples(n)
+
+        per_sample = sum(len(json.dumps(s)) for s in samples)
+        batch = len(json.dumps({"type": "batch", "samples": samples}))
+        f32 = len(encode_samples(samples))
+        f64 = len(encode_samples(samples, float64=True))
+
+        print(f"{n:>8} {per_sample:>12} {batch:>11} {f32:>8} {f64:>8} {per_sample / f32:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench/bench_broadcast.py
+"""
+Broadcast CPU cost vs. subscriber count.
+
+Compares encoding the message once per subscriber (the old
+ConnectionManager.broadcast) with encoding it once per broadcast.
+Sockets are in-memory fakes, so only server-side work is measured.
+
+    python -m bench.bench_broadcast
+"""
+import asyncio
+import json
+import time
+
+from realtime.connection_manager import ConnectionManager
+
+MESSAGES = 200
+SUBSCRIBERS = (1, 10, 100, 500, 1000)
+
+MESSAGE = {
+    "type": "batch",
+    "samples": [
+        {"metric": m, "value": 21.5 + i, "timestamp": "2025-01-01T00:00:00+00:00"}
+        for i, m in enumerate(["rt", "rh", "lux"] * 10)
+    ],
+}
+
+
+class FakeWebSocket:
+    def __init__(self, n: int):
+        self.client = ("bench", n)
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.received += 1
+
+
+async def per_subscriber_encode(sockets) -> float:
+    started = time.process_time()
+    for _ in range(MESSAGES):
+        for ws in sockets:
+            await ws.send_text(json.dumps(MESSAGE))
+    return time.process_time() - started
+
+
+async def encode_once(sockets) -> float:
+    manager = ConnectionManager(queue_size=MESSAGES)
+    for ws in sockets:
+        await manager.connect(ws)
+
+    started = time.process_time()
+    for _ in range(MESSAGES):
+        await manager.broadcast(MESSAGE)
+    # Let every writer drain its queue
+    while any(c.queue.qsize() for c in manager.active_connections.values()):
+        await asyncio.sleep(0)
+    elapsed = time.process_time() - started
+
+    for ws in sockets:
+        manager.disconnect(ws)
+    return elapsed
+
+
+async def main():
+    print(f"{MESSAGES} broadcasts, CPU seconds")
+    print(f"{'subscribers':>12} {'per-socket':>12} {'encode-once':>12} {'speedup':>8}")
+    for n in SUBSCRIBERS:
+        baseline = await per_subscriber_encode([FakeWebSocket(i) for i in range(n)])
+        shared = await encode_once([FakeWebSocket(i) for i in range(n)])
+        print(f"{n:>12} {baseline:>12.4f} {shared:>12.4f} {baseline / shared:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
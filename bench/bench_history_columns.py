@@ -0,0 +1,73 @@
+# bench/bench_history_columns.py
+"""
+Rows/sec of the two /history/{metric} response paths, offline on
+synthetic Mongo documents (no database needed):
+
+    rows     HistoryRecord per doc, then FastAPI's jsonable_encoder
+             and JSONResponse rendering
+    columns  {timestamp, value} projection -> two lists -> JSONResponse
+
+    python -m bench.bench_history_columns
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from repository.HistoryRepositoryImpl import HistoryRepositoryImpl
+
+ROW_COUNTS = (100, 1000, 10000)
+REPEAT = 5
+
+
+def make_docs(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    docs = []
+    for i in range(n):
+        ts = start + timedelta(seconds=3 * i)
+        docs.append({
+            "_id": ObjectId(),
+            "value": round(rnd.uniform(20, 35), 2),
+            "timestamp": ts,
+            "timestamp_local": ts + timedelta(hours=7),
+        })
+    return docs
+
+
+def rows_path(docs):
+    records = [HistoryRepositoryImpl._to_record("rt", doc) for doc in docs]
+    return JSONResponse(content=jsonable_encoder(records)).body
+
+
+def columns_path(docs):
+    projected = [{"timestamp": d["timestamp"], "value": d["value"]} for d in docs]
+    return JSONResponse(content=HistoryRepositoryImpl._to_columns(projected)).body
+
+
+def best_of(fn, docs) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    print(f"{'rows':>7} {'rows/s':>11} {'columns/s':>11} {'speedup':>8} {'rows B':>9} {'cols B':>9}")
+    for n in ROW_COUNTS:
+        docs = make_docs(n)
+        rows_t = best_of(rows_path, docs)
+        cols_t = best_of(columns_path, docs)
+        print(
+            f"{n:>7} {n / rows_t:>11,.0f} {n / cols_t:>11,.0f} {rows_t / cols_t:>7.1f}x"
+            f" {len(rows_path(docs)):>9} {len(columns_path(docs)):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
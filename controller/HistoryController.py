@@ -1,26 +1,152 @@
 # controller/HistoryController.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
-from service.HistoryService import HistoryService
+from service.HistoryService import EXPORT_FORMATS, HistoryService
 from repository.HistoryRepositoryImpl import HistoryRepositoryImpl
 from dependencies.auth import get_current_user
 
 router = APIRouter(prefix="/history", tags=["History"])
 
+METRICS = {"lux", "rh", "rt"}
+
+
 def get_history_service():
     return HistoryService(HistoryRepositoryImpl())
 
 
+def ensure_known_metric(metric: str) -> None:
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail="Unknown metric")
+
+
+@router.get("")
+async def get_aligned_history(
+    metrics: str = "rt,rh,lux",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    step: str = "1m",  # e.g. 30s | 5m | 1h
+    fill: str = "locf",  # locf | null
+    user = Depends(get_current_user),
+    service: HistoryService = Depends(get_history_service),
+):
+    """
+    Several metrics in one call, aligned on a shared grid of `step`.
+    Per-metric queries run concurrently. Without start, the last 24
+    hours (before end) are returned.
+    """
+    names = [m.strip() for m in metrics.split(",") if m.strip()]
+    if not names:
+        raise HTTPException(status_code=400, detail="No metrics requested")
+    for metric in names:
+        ensure_known_metric(metric)
+
+    try:
+        aligned = await service.get_aligned_history(
+            list(dict.fromkeys(names)), step, fill, start, end
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return JSONResponse(content=aligned)
+
+
+@router.get("/{metric}/aggregate")
+async def get_history_aggregate(
+    metric: str,  # lux | rh | rt
+    bucket: str = "5m",  # 1m | 5m | 1h
+    fn: str = "avg,min,max,count",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    user = Depends(get_current_user),
+    service: HistoryService = Depends(get_history_service),
+):
+    """
+    One row per time bucket, reduced in MongoDB from the minute/hour
+    rollups when they resolve the bucket, otherwise from raw samples.
+    Without start, the last 24 hours (before end) are aggregated.
+    """
+    ensure_known_metric(metric)
+
+    fns = [f.strip() for f in fn.split(",") if f.strip()]
+
+    try:
+        return await service.get_metric_aggregate(metric, bucket, fns, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{metric}/page")
+async def get_history_page(
+    metric: str,  # lux | rh | rt
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    user = Depends(get_current_user),
+    service: HistoryService = Depends(get_history_service),
+):
+    """
+    Newest first. Pass the returned next_cursor to get the following page.
+    """
+    ensure_known_metric(metric)
+
+    try:
+        return await service.get_metric_history_page(metric, start, end, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{metric}/export")
+async def export_history(
+    metric: str,  # lux | rh | rt
+    format: str = "ndjson",  # ndjson | csv
+    start: datetime | None = None,
+    end: datetime | None = None,
+    user = Depends(get_current_user),
+    service: HistoryService = Depends(get_history_service),
+):
+    """
+    Stream every sample in the range, oldest first, without building
+    the whole result in memory.
+    """
+    ensure_known_metric(metric)
+
+    try:
+        chunks = service.export_metric_history(metric, format, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{metric}.{format}"',
+        },
+    )
+
+
 @router.get("/{metric}")
 async def get_history(
     metric: str,  # lux | rh | rt
     start: datetime | None = None,
     end: datetime | None = None,
     limit: int = 100,
+    format: str = "rows",  # rows | columns
     user = Depends(get_current_user),
     service: HistoryService = Depends(get_history_service),
 ):
-    if metric not in {"lux", "rh", "rt"}:
-        raise HTTPException(status_code=404, detail="Unknown metric")
+    """
+    format=columns returns {"ts": [...], "value": [...]} and skips
+    per-row model building and response validation.
+    """
+    ensure_known_metric(metric)
+
+    if format == "columns":
+        columns = await service.get_metric_history_columns(metric, start, end, limit)
+        return JSONResponse(content=columns)
+
+    if format != "rows":
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'")
 
-    return await service.get_metric_history(metric, start, end, limit)
\ No newline at end of file
+    return await service.get_metric_history(metric, start, end, limit)
@@ -1,7 +1,19 @@
 # controller/IngestController.py
-from fastapi import APIRouter, HTTPException
-from datetime import datetime
+from fastapi import APIRouter, Body, HTTPException
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import math
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from data.history_cache import history_cache
+from data.indexes import index_manager
+from data.metric_store import metric_store
+from data.rollups import rollups
 from data.mongo import mongo
+from data.write_buffer import write_buffer
+from model.model import IngestSample
 from realtime.connection_manager import manager
 
 router = APIRouter(prefix="/ingest", tags=["Ingest"])
@@ -16,12 +28,13 @@ async def ingest(metric: str, value: float):
 
     ts = datetime.utcnow()
 
-    collection = mongo.client["IoT_"][metric]
-
-    await collection.insert_one({
+    # Resolves once the buffer's group commit has stored the row
+    written = await write_buffer.put(metric, {
         "value": value,
         "timestamp": ts,
     })
+    if not await written:
+        raise HTTPException(status_code=503, detail="Sample could not be stored")
 
     await manager.broadcast({
         "metric": metric,
@@ -29,4 +42,90 @@ async def ingest(metric: str, value: float):
         "timestamp": ts.isoformat(),
     })
 
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.post("/batch")
+async def ingest_batch(rows: List[Any] = Body(...)):
+    """
+    Bulk ingest: one insert_many per metric collection and
+    a single batched WebSocket frame for the whole request.
+    Rows are validated one by one; a malformed row, or one that
+    is not an object, is counted as rejected.
+    """
+    if mongo.client is None:
+        raise RuntimeError("MongoDB client not initialized")
+
+    received_at = datetime.utcnow()
+
+    groups: Dict[str, List[dict]] = {}
+    rejected = 0
+
+    for row in rows:
+        if not isinstance(row, dict):
+            rejected += 1
+            continue
+
+        try:
+            sample = IngestSample.model_validate(row)
+        except ValidationError:
+            rejected += 1
+            continue
+
+        if not math.isfinite(sample.value):
+            rejected += 1
+            continue
+
+        ts = sample.timestamp or received_at
+        if ts.tzinfo is not None:
+            # Store naive UTC, same as single-sample ingest
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+        groups.setdefault(sample.metric, []).append({
+            "value": sample.value,
+            "timestamp": ts,
+        })
+
+    accepted = 0
+    samples: List[dict] = []
+
+    for metric, docs in groups.items():
+        try:
+            await index_manager.ensure_metric(metric)
+            await metric_store.insert_many(metric, docs, ordered=False)
+            inserted = docs
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+        except Exception as e:
+            print(f"⚠️ Batch insert failed for '{metric}':", repr(e))
+            rejected += len(docs)
+            continue
+
+        rejected += len(docs) - len(inserted)
+        if not inserted:
+            continue
+
+        history_cache.invalidate_docs(metric, inserted)
+        await rollups.apply(metric, inserted)
+        accepted += len(inserted)
+        samples.extend(
+            {
+                "metric": metric,
+                "value": doc["value"],
+                "timestamp": doc["timestamp"].isoformat(),
+            }
+            for doc in inserted
+        )
+
+    if samples:
+        await manager.broadcast({
+            "type": "batch",
+            "samples": samples,
+        })
+
+    return {
+        "status": "ok",
+        "accepted": accepted,
+        "rejected": rejected,
+    }
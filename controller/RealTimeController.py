@@ -6,10 +6,19 @@ router = APIRouter()
 
 @router.websocket("/ws/metrics")
 async def metrics_ws(websocket: WebSocket):
-    await manager.connect(websocket)
+    # ?format=binary[&precision=float64] opts into binary sample frames
+    wire = "json"
+    if websocket.query_params.get("format") == "binary":
+        wire = "f64" if websocket.query_params.get("precision") == "float64" else "f32"
+
+    await manager.connect(websocket, wire)
     try:
         while True:
-            # Keep connection alive (client doesn’t need to send)
-            await websocket.receive_text()
+            # Optional subscribe/unsubscribe control messages
+            text = await websocket.receive_text()
+            await manager.handle_message(websocket, text)
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also covers sockets the manager closed as slow consumers
         manager.disconnect(websocket)
\ No newline at end of file
@@ -1,5 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from data.history_cache import history_cache
+from data.indexes import index_manager
 from data.mongo import mongo
+from data.rollups import rollups
+from data.write_buffer import write_buffer
+from dependencies.auth import get_current_user
+from gateway.adafruit_gateway import http_stats
+from gateway.scheduler import scheduler
+from realtime.connection_manager import manager
 
 router = APIRouter(
     prefix="/system",
@@ -27,4 +35,55 @@ async def health_check():
                 "mongodb": "disconnected",
                 "reason": str(e),
             },
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/write-buffer")
+async def write_buffer_stats():
+    """
+    Group-commit buffer metrics (batch size, flush latency, queue depth).
+    """
+    return write_buffer.stats()
+
+
+@router.get("/gateway")
+async def gateway_stats():
+    """
+    Adafruit poller metrics: per-request latency, per-feed intervals
+    and the request budget.
+    """
+    return {"http": http_stats, "scheduler": scheduler.stats()}
+
+
+@router.get("/realtime")
+async def realtime_stats(user = Depends(get_current_user)):
+    """
+    WebSocket fan-out metrics: per-client queue depth and drops.
+    Includes client addresses, so it needs a logged-in user.
+    """
+    return manager.stats()
+
+
+@router.get("/indexes")
+async def index_report(user = Depends(get_current_user)):
+    """
+    Which of our queries are served by an index, checked with explain().
+    Lists collection names, so it needs a logged-in user.
+    """
+    return await index_manager.coverage_report()
+
+
+@router.get("/history-cache")
+async def history_cache_stats():
+    """
+    History query cache: hits, misses, shared in-flight loads.
+    """
+    return history_cache.stats()
+
+
+@router.get("/rollups")
+async def rollup_stats():
+    """
+    Minute/hour rollup maintenance counters.
+    """
+    return rollups.stats()
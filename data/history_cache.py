@@ -0,0 +1,202 @@
+# data/history_cache.py
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from helper.timeutils import ensure_utc
+
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "256"))
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "30"))
+
+# Bus message type carrying an invalidation to the other workers
+INVALIDATE = "cache-invalidate"
+
+Key = Tuple[str, Hashable]
+Publish = Callable[[dict], Awaitable[None]]
+
+
+class _Entry:
+    __slots__ = ("expires", "start", "end", "value")
+
+    def __init__(self, expires: float, start, end, value):
+        self.expires = expires
+        self.start = start
+        self.end = end
+        self.value = value
+
+
+class HistoryCache:
+    """
+    Bounded LRU + TTL cache for history query results.
+
+    Entries are keyed by (metric, params) and remember their time window
+    so that writes only evict the windows they can change: invalidate()
+    drops a metric's open-ended windows and any window overlapping the
+    written timestamps. Concurrent misses on the same key share a single
+    in-flight query.
+
+    Each worker has its own cache, so with a cross-worker bus bound
+    invalidate_docs() also announces the written range to the other
+    workers, which apply it through apply_remote().
+    """
+
+    def __init__(self, max_entries: int = HISTORY_CACHE_SIZE, ttl: float = HISTORY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._inflight: Dict[Key, asyncio.Future] = {}
+        # Bumped on every invalidation; a load that started before
+        # the bump must not store its (possibly stale) result
+        self._generation: Dict[str, int] = {}
+
+        self._publish: Optional[Publish] = None
+        self._announcing: Set[asyncio.Future] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.remote_invalidations = 0
+
+    def bind(self, publish: Optional[Publish]) -> None:
+        """
+        Relay invalidations through publish (the realtime bus's);
+        None keeps them local to this worker.
+        """
+        self._publish = publish
+
+    async def get_or_load(
+        self,
+        metric: str,
+        params: Hashable,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        key = (metric, params)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            # Own task, so a caller that is cancelled (client gone) does
+            # not cancel the query for everyone sharing it
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            generation = self._generation.get(metric, 0)
+            task.add_done_callback(
+                lambda t: self._finish(key, metric, generation, start, end, t)
+            )
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Key, metric: str, generation: int, start, end, task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self._generation.get(metric, 0) == generation:
+            self._store(key, start, end, task.result())
+
+    def _store(self, key: Key, start, end, value) -> None:
+        self._entries[key] = _Entry(
+            time.monotonic() + self.ttl,
+            ensure_utc(start) if start else None,
+            ensure_utc(end) if end else None,
+            value,
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(
+        self,
+        metric: str,
+        oldest: Optional[datetime] = None,
+        newest: Optional[datetime] = None,
+    ) -> None:
+        """
+        Called after samples in [oldest, newest] were written for metric.
+        Without bounds every window of the metric is dropped.
+        """
+        self._generation[metric] = self._generation.get(metric, 0) + 1
+
+        oldest = ensure_utc(oldest) if oldest else None
+        newest = ensure_utc(newest) if newest else None
+
+        for key in [k for k in self._entries if k[0] == metric]:
+            entry = self._entries[key]
+            if oldest and entry.end is not None and entry.end < oldest:
+                continue
+            if newest and entry.start is not None and entry.start > newest:
+                continue
+            del self._entries[key]
+            self.invalidations += 1
+
+    def invalidate_docs(self, metric: str, docs) -> None:
+        stamps = [d["timestamp"] for d in docs if isinstance(d.get("timestamp"), datetime)]
+        oldest = min(stamps) if stamps else None
+        newest = max(stamps) if stamps else None
+        self.invalidate(metric, oldest, newest)
+        self._announce(metric, oldest, newest)
+
+    def _announce(self, metric: str, oldest: Optional[datetime], newest: Optional[datetime]) -> None:
+        if self._publish is None:
+            return
+        task = asyncio.ensure_future(self._publish({
+            "type": INVALIDATE,
+            "origin": os.getpid(),
+            "metric": metric,
+            "oldest": ensure_utc(oldest).isoformat() if oldest else None,
+            "newest": ensure_utc(newest).isoformat() if newest else None,
+        }))
+        self._announcing.add(task)
+        task.add_done_callback(self._announcing.discard)
+
+    def apply_remote(self, message: dict) -> None:
+        """
+        Invalidation announced by another worker over the bus.
+        """
+        if message.get("origin") == os.getpid():
+            return
+        try:
+            oldest = datetime.fromisoformat(message["oldest"]) if message.get("oldest") else None
+            newest = datetime.fromisoformat(message["newest"]) if message.get("newest") else None
+        except (TypeError, ValueError):
+            oldest = newest = None
+        self.remote_invalidations += 1
+        self.invalidate(message["metric"], oldest, newest)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "hit_ratio": round((self.hits + self.shared) / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
+
+
+history_cache = HistoryCache()
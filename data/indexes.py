@@ -0,0 +1,221 @@
+# data/indexes.py
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from data.metric_store import DB_NAME, TIMESERIES_COLLECTION, metric_store
+from data.mongo import mongo
+from data.rollups import ROLLUP_STATE, ROLLUPS
+
+# Collections in IoT_ that do not hold per-metric samples
+RESERVED_COLLECTIONS = {"User", "ingest_state", TIMESERIES_COLLECTION, ROLLUP_STATE, *ROLLUPS}
+
+# Mongo error codes
+DUPLICATE_KEY = 11000
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_KEY_SPECS_CONFLICT = 86
+
+# Any value works for explain(); only the plan shape matters
+PROBE_START = datetime(1970, 1, 1)
+PROBE_AFTER = (datetime(2000, 1, 1), ObjectId("000000000000000000000000"))
+
+
+def is_metric_collection(name: str) -> bool:
+    return name not in RESERVED_COLLECTIONS and not name.startswith("system.")
+
+
+def _winning_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    if "queryPlanner" not in explain:
+        # Time-series finds explain as an aggregation over the buckets
+        explain = explain["stages"][0]["$cursor"]
+    return explain["queryPlanner"]["winningPlan"]
+
+
+def _stages(plan: Dict[str, Any]) -> List[str]:
+    """
+    Flatten a winning plan into its stage names, top-down.
+    """
+    plan = plan.get("queryPlan", plan)  # SBE explain output
+    stages = [plan.get("stage", "?")]
+    if "inputStage" in plan:
+        stages += _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    return stages
+
+
+class IndexManager:
+    """
+    Creates the indexes our queries rely on:
+
+        <metric>.timestamp,_id    history range/sort and keyset pagination
+        <metric>.timestamp asc    unique over rows with source "adafruit",
+                                  so gateway/backfill duplicates are skipped
+                                  cheaply while ingested rows may share a
+                                  timestamp
+        User.email unique         login / register lookups
+        ingest_state.metric       watermark upserts
+        rollup_*.metric,bucket    rollup upserts and $merge (unique)
+
+    With METRIC_STORAGE=timeseries the per-metric indexes are replaced
+    by one (meta.metric, timestamp) index on the shared time-series
+    collection; unique indexes are not supported there, so backfill
+    skips timestamps already stored before inserting a page.
+
+    ensure_startup() runs from the lifespan; ensure_metric() is called
+    by every writer and is a no-op after the first call per collection.
+    """
+
+    def __init__(self):
+        self._indexed: set[str] = set()
+
+    @property
+    def db(self):
+        return mongo.client[DB_NAME]  # type: ignore
+
+    async def _create(self, collection: str, keys, **options) -> Optional[str]:
+        try:
+            return await self.db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            if e.code in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                # Same keys already indexed under another name/options
+                return None
+            raise
+
+    async def ensure_metric(self, metric: str) -> None:
+        if not is_metric_collection(metric):
+            return
+
+        if metric_store.timeseries:
+            return await self._ensure_timeseries()
+
+        if metric in self._indexed:
+            return
+
+        # Marked up front: a failed index must never block the write path,
+        # and retrying on every flush would only add round trips
+        self._indexed.add(metric)
+
+        for keys, options in (
+            # Range queries sorted on timestamp use its prefix
+            ([("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "timestamp_id_desc"}),
+            (
+                [("timestamp", ASCENDING)],
+                {
+                    "name": "adafruit_timestamp_unique",
+                    "unique": True,
+                    "partialFilterExpression": {"source": "adafruit"},
+                },
+            ),
+        ):
+            try:
+                await self._create(metric, keys, **options)
+            except Exception as e:
+                print(f"⚠️ Index {options['name']} on '{metric}' not created:", repr(e))
+
+    async def _ensure_timeseries(self) -> None:
+        if TIMESERIES_COLLECTION in self._indexed:
+            return
+        self._indexed.add(TIMESERIES_COLLECTION)
+
+        try:
+            await metric_store.ensure_timeseries_collection()
+            await self._create(
+                TIMESERIES_COLLECTION,
+                [("meta.metric", ASCENDING), ("timestamp", DESCENDING)],
+                name="metric_timestamp",
+            )
+        except Exception as e:
+            print(f"⚠️ Time-series collection '{TIMESERIES_COLLECTION}' not ready:", repr(e))
+
+    async def ensure_startup(self) -> None:
+        for keys, collection, name in (
+            ([("email", ASCENDING)], "User", "email_unique"),
+            ([("metric", ASCENDING)], "ingest_state", "metric_unique"),
+            *(
+                ([("metric", ASCENDING), ("bucket", ASCENDING)], name, "metric_bucket_unique")
+                for name in ROLLUPS
+            ),
+        ):
+            try:
+                await self._create(collection, keys, unique=True, name=name)
+            except OperationFailure as e:
+                print(f"⚠️ Index {collection}.{name} not created:", repr(e))
+
+        if metric_store.timeseries:
+            await self._ensure_timeseries()
+            print(f"🗂️ Indexes ensured for time-series collection '{TIMESERIES_COLLECTION}'")
+            return
+
+        for name in await self.db.list_collection_names():
+            if is_metric_collection(name):
+                await self.ensure_metric(name)
+
+        print(f"🗂️ Indexes ensured for {len(self._indexed)} metric collection(s)")
+
+    async def coverage_report(self) -> List[dict]:
+        """
+        explain() the queries the app runs and report whether the winning
+        plan uses an index (IXSCAN) or scans the collection (COLLSCAN).
+        """
+        queries = [
+            ("User", "find_by_email", {"email": "probe@example.com"}, None),
+            ("ingest_state", "watermark lookup", {"metric": "probe"}, None),
+        ]
+        if metric_store.timeseries:
+            queries.append((
+                TIMESERIES_COLLECTION, "get_history",
+                metric_store.match("probe", {"timestamp": {"$gte": PROBE_START}}),
+                [("timestamp", DESCENDING)],
+            ))
+        for name in sorted(await self.db.list_collection_names()):
+            if is_metric_collection(name) and not metric_store.timeseries:
+                queries.append((
+                    name, "get_history",
+                    {"timestamp": {"$gte": PROBE_START}},
+                    [("timestamp", DESCENDING)],
+                ))
+                ts, oid = PROBE_AFTER
+                queries.append((
+                    name, "get_history_page",
+                    # The keyset seek, as HistoryRepositoryImpl builds it
+                    {"$and": [
+                        {"timestamp": {"$gte": PROBE_START}},
+                        {"$or": [
+                            {"timestamp": {"$lt": ts}},
+                            {"timestamp": ts, "_id": {"$lt": oid}},
+                        ]},
+                    ]},
+                    [("timestamp", DESCENDING), ("_id", DESCENDING)],
+                ))
+
+        report = []
+        for collection, query_name, query, sort in queries:
+            cursor = self.db[collection].find(query).limit(100)
+            if sort:
+                cursor = cursor.sort(sort)
+            try:
+                explain = await cursor.explain()
+                stages = _stages(_winning_plan(explain))
+            except Exception as e:
+                report.append({
+                    "collection": collection,
+                    "query": query_name,
+                    "error": repr(e),
+                })
+                continue
+
+            report.append({
+                "collection": collection,
+                "query": query_name,
+                "stages": stages,
+                "covered": "IXSCAN" in stages and "COLLSCAN" not in stages,
+            })
+
+        return report
+
+
+index_manager = IndexManager()
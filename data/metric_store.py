@@ -0,0 +1,100 @@
+# data/metric_store.py
+import os
+from typing import List
+
+from data.mongo import mongo
+
+DB_NAME = "IoT_"
+
+# "collections": one ordinary collection per metric (default)
+# "timeseries":  all metrics in one native time-series collection
+METRIC_STORAGE = os.getenv("METRIC_STORAGE", "collections").lower()
+TIMESERIES_COLLECTION = os.getenv("TIMESERIES_COLLECTION", "metrics")
+TIMESERIES_GRANULARITY = os.getenv("TIMESERIES_GRANULARITY", "seconds")  # seconds | minutes | hours
+METRIC_DEVICE = os.getenv("METRIC_DEVICE", "adafruit")
+
+TIME_FIELD = "timestamp"
+META_FIELD = "meta"
+
+
+class MetricStore:
+    """
+    Where metric samples live. Readers and writers go through this so
+    they work against either layout:
+
+        collections   IoT_.<metric>    {timestamp, value, ...}
+        timeseries    IoT_.metrics     {timestamp, value, meta: {metric, device}}
+
+    Queries keep using "timestamp"/"value"; match() adds the metric
+    filter when all metrics share one collection.
+    """
+
+    def __init__(self, storage: str = METRIC_STORAGE):
+        if storage not in ("collections", "timeseries"):
+            print(f"⚠️ Unknown METRIC_STORAGE '{storage}', using collections")
+            storage = "collections"
+        self.storage = storage
+
+    @property
+    def timeseries(self) -> bool:
+        return self.storage == "timeseries"
+
+    @property
+    def db(self):
+        return mongo.client[DB_NAME]  # type: ignore
+
+    def collection_name(self, metric: str) -> str:
+        return TIMESERIES_COLLECTION if self.timeseries else metric
+
+    def collection(self, metric: str):
+        return self.db[self.collection_name(metric)]
+
+    def match(self, metric: str, query: dict) -> dict:
+        if not self.timeseries:
+            return query
+        return {f"{META_FIELD}.metric": metric, **query}
+
+    def to_documents(self, metric: str, docs: List[dict]) -> List[dict]:
+        if not self.timeseries:
+            return docs
+        return [
+            {
+                **{k: v for k, v in doc.items() if k != "device"},
+                META_FIELD: {"metric": metric, "device": doc.get("device", METRIC_DEVICE)},
+            }
+            for doc in docs
+        ]
+
+    async def insert_many(self, metric: str, docs: List[dict], ordered: bool = True):
+        """
+        Insert samples of one metric. BulkWriteError indexes refer to
+        positions in docs, as with a plain insert_many.
+        """
+        return await self.collection(metric).insert_many(
+            self.to_documents(metric, docs), ordered=ordered
+        )
+
+    async def ensure_timeseries_collection(self) -> bool:
+        """
+        Create the shared time-series collection if missing.
+        Returns True when it was created.
+        """
+        if TIMESERIES_COLLECTION in await self.db.list_collection_names():
+            return False
+
+        await self.db.create_collection(
+            TIMESERIES_COLLECTION,
+            timeseries={
+                "timeField": TIME_FIELD,
+                "metaField": META_FIELD,
+                "granularity": TIMESERIES_GRANULARITY,
+            },
+        )
+        print(
+            f"🗜️ Created time-series collection '{TIMESERIES_COLLECTION}'"
+            f" (granularity={TIMESERIES_GRANULARITY})"
+        )
+        return True
+
+
+metric_store = MetricStore()
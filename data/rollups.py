@@ -0,0 +1,211 @@
+# data/rollups.py
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from data.metric_store import metric_store
+
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+
+# rollup collection -> ($dateTrunc unit, seconds per bucket), finest first
+ROLLUPS: Dict[str, Tuple[str, int]] = {
+    "rollup_1m": ("minute", 60),
+    "rollup_1h": ("hour", 3600),
+}
+
+UNIT_SECONDS = {"minute": 60, "hour": 3600}
+
+# One {metric, rebuilt_at, rebuilt_until} marker per metric whose rollups
+# were rebuilt from raw samples; reads use rollups only after that
+ROLLUP_STATE = "rollup_state"
+READY_RECHECK_SECONDS = 60
+
+
+def truncate(ts: datetime, unit: str) -> datetime:
+    """
+    Start of the UTC minute/hour containing ts, as a naive UTC datetime
+    (the way pymongo hands timestamps back).
+    """
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = ts.replace(second=0, microsecond=0)
+    if unit == "hour":
+        ts = ts.replace(minute=0)
+    return ts
+
+
+def pick_rollup(unit: str, bin_size: int) -> Optional[str]:
+    """
+    Coarsest rollup whose buckets tile the requested bucket exactly.
+    """
+    if not ROLLUPS_ENABLED or unit not in UNIT_SECONDS:
+        return None
+    requested = UNIT_SECONDS[unit] * bin_size
+    best = None
+    for name, (_, seconds) in ROLLUPS.items():
+        if requested % seconds == 0:
+            best = name
+    return best
+
+
+class RollupWriter:
+    """
+    Keeps per-minute and per-hour {count, sum, min, max} documents per
+    metric up to date. Writers call apply() with the samples they just
+    inserted; each batch becomes one $inc/$min/$max upsert per touched
+    bucket. rebuild() recomputes rollups from the raw samples.
+
+    Rollups only hold what was written since they were enabled, so
+    ready() stays False for a metric (and aggregates read raw samples)
+    until rebuild() has run for it once.
+    """
+
+    def __init__(self):
+        self.updates = 0
+        self.failures = 0
+        self._ready: set[str] = set()
+        self._checked_at: Dict[str, float] = {}
+
+    async def ready(self, metric: str) -> bool:
+        if metric in self._ready:
+            return True
+
+        now = time.monotonic()
+        if now - self._checked_at.get(metric, -READY_RECHECK_SECONDS) < READY_RECHECK_SECONDS:
+            return False
+        self._checked_at[metric] = now
+
+        try:
+            marker = await metric_store.db[ROLLUP_STATE].find_one({"metric": metric})
+        except Exception as e:
+            print(f"⚠️ Rollup state lookup for '{metric}' failed:", repr(e))
+            return False
+
+        if marker is not None:
+            self._ready.add(metric)
+        return marker is not None
+
+    async def apply(self, metric: str, docs: List[dict]) -> None:
+        if not ROLLUPS_ENABLED or not docs:
+            return
+
+        for name, (unit, _) in ROLLUPS.items():
+            partials: Dict[datetime, dict] = {}
+            for doc in docs:
+                ts = doc.get("timestamp")
+                if not isinstance(ts, datetime):
+                    continue
+                value = float(doc["value"])
+                bucket = truncate(ts, unit)
+                p = partials.get(bucket)
+                if p is None:
+                    partials[bucket] = {"count": 1, "sum": value, "min": value, "max": value}
+                else:
+                    p["count"] += 1
+                    p["sum"] += value
+                    p["min"] = min(p["min"], value)
+                    p["max"] = max(p["max"], value)
+
+            if not partials:
+                continue
+
+            try:
+                await metric_store.db[name].bulk_write(
+                    [
+                        UpdateOne(
+                            {"metric": metric, "bucket": bucket},
+                            {
+                                "$inc": {"count": p["count"], "sum": p["sum"]},
+                                "$min": {"min": p["min"]},
+                                "$max": {"max": p["max"]},
+                            },
+                            upsert=True,
+                        )
+                        for bucket, p in partials.items()
+                    ],
+                    ordered=False,
+                )
+                self.updates += len(partials)
+            except Exception as e:
+                # Raw samples are already stored; rebuild() can repair this
+                self.failures += 1
+                print(f"⚠️ Rollup update for '{metric}' in {name} failed:", repr(e))
+
+    async def rebuild(
+        self,
+        metric: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> None:
+        """
+        Recompute every rollup bucket of metric in [start, end) from raw
+        samples and $merge the result over the existing documents.
+        Pass bucket-aligned bounds so edge buckets are not replaced with
+        partial sums.
+        """
+        match: dict = {}
+        if start or end:
+            match["timestamp"] = {}
+            if start:
+                match["timestamp"]["$gte"] = start
+            if end:
+                match["timestamp"]["$lt"] = end
+        match = metric_store.match(metric, match)
+
+        for name, (unit, _) in ROLLUPS.items():
+            pipeline = [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": {"$dateTrunc": {"date": "$timestamp", "unit": unit}},
+                        "count": {"$sum": 1},
+                        "sum": {"$sum": "$value"},
+                        "min": {"$min": "$value"},
+                        "max": {"$max": "$value"},
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "metric": {"$literal": metric},
+                        "bucket": "$_id",
+                        "count": 1,
+                        "sum": 1,
+                        "min": 1,
+                        "max": 1,
+                    }
+                },
+                {
+                    "$merge": {
+                        "into": name,
+                        "on": ["metric", "bucket"],
+                        "whenMatched": "replace",
+                        "whenNotMatched": "insert",
+                    }
+                },
+            ]
+
+            async for _ in await metric_store.collection(metric).aggregate(pipeline):
+                pass
+
+        await metric_store.db[ROLLUP_STATE].update_one(
+            {"metric": metric},
+            {"$set": {"rebuilt_at": datetime.now(timezone.utc), "rebuilt_until": end}},
+            upsert=True,
+        )
+        self._ready.add(metric)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ROLLUPS_ENABLED,
+            "collections": list(ROLLUPS),
+            "ready": sorted(self._ready),
+            "bucket_updates": self.updates,
+            "failures": self.failures,
+        }
+
+
+rollups = RollupWriter()
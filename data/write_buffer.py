@@ -0,0 +1,231 @@
+# data/write_buffer.py
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from data.history_cache import history_cache
+from data.indexes import DUPLICATE_KEY, index_manager
+from data.metric_store import metric_store
+from data.rollups import rollups
+
+# ======================
+# Tuning
+# ======================
+
+WRITE_BUFFER_MAX_ROWS = int(os.getenv("WRITE_BUFFER_MAX_ROWS", "500"))
+WRITE_BUFFER_MAX_DELAY_MS = int(os.getenv("WRITE_BUFFER_MAX_DELAY_MS", "20"))
+WRITE_BUFFER_QUEUE_SIZE = int(os.getenv("WRITE_BUFFER_QUEUE_SIZE", "10000"))
+
+
+class WriteBuffer:
+    """
+    Group-commit buffer for metric inserts.
+
+    Rows are queued by put() and flushed by a background task with one
+    insert_many per metric collection, either every max_delay_ms or as
+    soon as max_rows are pending. The queue is bounded: put() waits when
+    it is full, which pushes back on the ingest path instead of growing
+    memory.
+
+    put() returns a future that resolves to True once the row is stored
+    (or already was, for duplicate keys) and to False if the flush
+    failed, so callers can hold back dependent state until then.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = WRITE_BUFFER_MAX_ROWS,
+        max_delay_ms: int = WRITE_BUFFER_MAX_DELAY_MS,
+        queue_size: int = WRITE_BUFFER_QUEUE_SIZE,
+    ):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.queue_size = queue_size
+
+        self._queue: Optional[asyncio.Queue[Tuple[str, dict, asyncio.Future]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._pending: List[Tuple[str, dict, asyncio.Future]] = []
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ----------------------
+    # Lifecycle
+    # ----------------------
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the flusher and write out everything still queued.
+        """
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+
+        pending, self._pending = self._pending, []
+        await self._flush(pending)
+
+        while self._queue is not None and not self._queue.empty():
+            await self._flush(self._drain(self.max_rows))
+
+        self._queue = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # ----------------------
+    # Producer side
+    # ----------------------
+
+    async def put(self, metric: str, doc: dict) -> asyncio.Future:
+        if self._queue is None:
+            raise RuntimeError("Write buffer not started")
+        written = asyncio.get_running_loop().create_future()
+        await self._queue.put((metric, doc, written))
+        return written
+
+    # ----------------------
+    # Flusher
+    # ----------------------
+
+    def _drain(self, limit: int) -> List[Tuple[str, dict, asyncio.Future]]:
+        batch: List[Tuple[str, dict, asyncio.Future]] = []
+        while len(batch) < limit and not self._queue.empty():  # type: ignore
+            batch.append(self._queue.get_nowait())  # type: ignore
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            self._pending.append(await self._queue.get())  # type: ignore
+            deadline = loop.time() + self.max_delay
+
+            while len(self._pending) < self.max_rows:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)  # type: ignore
+                except asyncio.TimeoutError:
+                    break
+                self._pending.append(item)
+
+            batch, self._pending = self._pending, []
+
+            # Shielded so a shutdown mid-write does not drop the batch;
+            # stop() waits for it before draining the queue.
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _flush(self, batch: List[Tuple[str, dict, asyncio.Future]]) -> None:
+        if not batch:
+            return
+
+        groups: Dict[str, List[dict]] = {}
+        futures: Dict[str, List[asyncio.Future]] = {}
+        for metric, doc, written in batch:
+            groups.setdefault(metric, []).append(doc)
+            futures.setdefault(metric, []).append(written)
+
+        started = time.perf_counter()
+
+        for metric, docs in groups.items():
+            # Rows already stored (duplicate key) count as written
+            errors: Dict[int, bool] = {}
+            try:
+                await index_manager.ensure_metric(metric)
+                await metric_store.insert_many(metric, docs, ordered=False)
+                inserted = docs
+            except BulkWriteError as e:
+                errors = {
+                    err["index"]: err.get("code") == DUPLICATE_KEY
+                    for err in e.details.get("writeErrors", [])
+                }
+                inserted = [doc for i, doc in enumerate(docs) if i not in errors]
+            except Exception as e:
+                print(f"⚠️ Write buffer flush failed for '{metric}':", repr(e))
+                self.rows_failed += len(docs)
+                self._resolve(futures[metric], lambda i: False)
+                continue
+
+            self._resolve(futures[metric], lambda i: errors.get(i, True))
+
+            self.rows_written += len(inserted)
+            self.rows_failed += len(docs) - len(inserted)
+            if inserted:
+                history_cache.invalidate_docs(metric, inserted)
+                await rollups.apply(metric, inserted)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.flushes += 1
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    @staticmethod
+    def _resolve(futures: List[asyncio.Future], ok) -> None:
+        for i, written in enumerate(futures):
+            if not written.done():
+                written.set_result(ok(i))
+
+    # ----------------------
+    # Metrics
+    # ----------------------
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "max_rows": self.max_rows,
+            "max_delay_ms": self.max_delay * 1000,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": (
+                (self.rows_written + self.rows_failed) / self.flushes
+                if self.flushes else 0
+            ),
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": (
+                round(self._total_flush_ms / self.flushes, 3)
+                if self.flushes else 0
+            ),
+        }
+
+
+write_buffer = WriteBuffer()
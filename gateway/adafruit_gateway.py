@@ -1,12 +1,25 @@
 import asyncio
+import importlib.util
+import json
 import os
+import time
 import httpx
-from datetime import datetime
-from typing import Optional, Tuple, List
-from datetime import timezone
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple, List
 import traceback
 
+from pymongo.errors import BulkWriteError
+
+from data.history_cache import history_cache
+from data.indexes import index_manager
+from data.metric_store import metric_store
+from data.rollups import rollups
 from data.mongo import mongo
+from data.write_buffer import write_buffer
+from gateway.mqtt_subscriber import MqttSubscriber
+from gateway.scheduler import RateLimited, parse_retry_after, scheduler
+from gateway.watermarks import watermarks
+from helper.timeutils import ensure_utc
 from realtime.connection_manager import manager
 
 # ======================
@@ -18,7 +31,42 @@ ADAFRUIT_KEY = os.getenv("ADAFRUIT_KEY")
 ADAFRUIT_FEEDS = os.getenv("ADAFRUIT_FEEDS", "").split(",")
 GATEWAY_INTERVAL = int(os.getenv("ADAFRUIT_POLL_INTERVAL", "3"))
 
-BASE_URL = "https://io.adafruit.com/api/v2"
+BASE_URL = os.getenv("ADAFRUIT_BASE_URL", "https://io.adafruit.com/api/v2")
+
+# Shared HTTP client tuning
+HTTP_TIMEOUT = float(os.getenv("ADAFRUIT_HTTP_TIMEOUT", "5"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ADAFRUIT_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("ADAFRUIT_HTTP_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("ADAFRUIT_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ADAFRUIT_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("ADAFRUIT_HTTP2", "false").lower() in {"1", "true", "yes"}
+
+# Concurrent polling
+POLL_CONCURRENCY = int(os.getenv("ADAFRUIT_POLL_CONCURRENCY", "8"))
+FEED_TIMEOUT = float(os.getenv("ADAFRUIT_FEED_TIMEOUT", "10"))
+
+# Catch-up backfill
+BACKFILL_ENABLED = os.getenv("ADAFRUIT_BACKFILL", "true").lower() in {"1", "true", "yes"}
+BACKFILL_GAP_SECONDS = float(os.getenv("ADAFRUIT_BACKFILL_GAP", "30"))
+BACKFILL_PAGE_SIZE = int(os.getenv("ADAFRUIT_BACKFILL_PAGE_SIZE", "1000"))
+BACKFILL_MAX_PAGES = int(os.getenv("ADAFRUIT_BACKFILL_MAX_PAGES", "50"))
+BACKFILL_TIMEOUT = float(os.getenv("ADAFRUIT_BACKFILL_TIMEOUT", "120"))
+# Initial time span per /data request; halved when a page comes back full
+BACKFILL_WINDOW = float(os.getenv("ADAFRUIT_BACKFILL_WINDOW", "3600"))
+BACKFILL_MIN_WINDOW = timedelta(seconds=1)
+
+# Groups fetched with one request each; their feeds are not polled one by one
+ADAFRUIT_GROUPS = [g.strip() for g in os.getenv("ADAFRUIT_GROUPS", "").split(",") if g.strip()]
+
+# "poll" (REST only) or "mqtt" (push, REST fallback while disconnected)
+GATEWAY_MODE = os.getenv("ADAFRUIT_GATEWAY_MODE", "poll").lower()
+MQTT_HOST = os.getenv("ADAFRUIT_MQTT_HOST", "io.adafruit.com")
+MQTT_PORT = int(os.getenv("ADAFRUIT_MQTT_PORT", "1883"))
+MQTT_TLS = os.getenv("ADAFRUIT_MQTT_TLS", "false").lower() in {"1", "true", "yes"}
+
+# Stored on every row written by the gateway; the unique timestamp
+# index only covers these, so ingested rows may share timestamps
+SOURCE = "adafruit"
 
 if not ADAFRUIT_USERNAME:
     raise RuntimeError("ADAFRUIT_USERNAME is not set")
@@ -30,16 +78,98 @@ if not ADAFRUIT_FEEDS or ADAFRUIT_FEEDS == [""]:
     raise RuntimeError("ADAFRUIT_FEEDS is not set")
 
 
+# ======================
+# Shared HTTP client
+# ======================
+
+_client: Optional[httpx.AsyncClient] = None
+
+http_stats = {
+    "requests": 0,
+    "errors": 0,
+    "last_ms": 0.0,
+    "avg_ms": 0.0,
+    "max_ms": 0.0,
+    "http_version": None,
+}
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    One keep-alive client for the gateway's lifetime, so each poll reuses
+    pooled connections instead of paying a new TLS handshake.
+    """
+    http2 = HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("⚠️ ADAFRUIT_HTTP2 set but 'h2' is not installed, using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        base_url=BASE_URL,
+        headers={"X-AIO-Key": ADAFRUIT_KEY},  # type: ignore
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def timed_get(path: str, **kwargs) -> httpx.Response:
+    """
+    GET through the shared client, recording per-request latency.
+    """
+    scheduler.note_request()
+
+    started = time.perf_counter()
+    try:
+        response = await get_http_client().get(path, **kwargs)
+    except Exception:
+        http_stats["errors"] += 1
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        http_stats["requests"] += 1
+        http_stats["last_ms"] = round(elapsed_ms, 3)
+        http_stats["max_ms"] = round(max(http_stats["max_ms"], elapsed_ms), 3)
+        # Running mean over every request since startup
+        n = http_stats["requests"]
+        http_stats["avg_ms"] = round(
+            http_stats["avg_ms"] + (elapsed_ms - http_stats["avg_ms"]) / n, 3
+        )
+
+    http_stats["http_version"] = response.http_version
+
+    if response.status_code == 429:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        scheduler.pause(retry_after)
+        raise RateLimited(retry_after)
+
+    return response
+
+
 # ======================
 # Adafruit API access
 # ======================
 
 async def fetch_latest(feed: str) -> Optional[dict]:
-    url = f"{BASE_URL}/{ADAFRUIT_USERNAME}/feeds/{feed}/data/last"
-    headers = {"X-AIO-Key": ADAFRUIT_KEY}
-
-    async with httpx.AsyncClient(timeout=5) as client:
-        response = await client.get(url, headers=headers) # type: ignore
+    response = await timed_get(f"/{ADAFRUIT_USERNAME}/feeds/{feed}/data/last")
 
     if response.status_code != 200:
         print(f"⚠️ Adafruit HTTP {response.status_code} for feed '{feed}'")
@@ -52,76 +182,106 @@ async def fetch_latest(feed: str) -> Optional[dict]:
         return None
 
 
-# ======================
-# Ingest state helpers
-# ======================
-
-async def get_last_timestamp(metric: str) -> Optional[datetime]:
-    state = await mongo.client["IoT_"]["ingest_state"].find_one(  # type: ignore
-        {"metric": metric}
-    )
-    if not state:
-        return None
-    return state.get("last_timestamp")
-
-def ensure_utc(dt: datetime) -> datetime:
+async def fetch_data_page(
+    feed: str,
+    start_time: datetime,
+    end_time: Optional[datetime],
+    limit: int,
+) -> List[dict]:
     """
-    Ensure datetime is timezone-aware in UTC.
+    One page of /data between start_time and end_time.
     """
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
-
-async def update_last_timestamp(metric: str, timestamp: datetime) -> None:
-    await mongo.client["IoT_"]["ingest_state"].update_one(  # type: ignore
-        {"metric": metric},
-        {"$set": {"last_timestamp": timestamp}},
-        upsert=True,
+    params = {
+        "start_time": ensure_utc(start_time).isoformat(),
+        "limit": limit,
+    }
+    if end_time is not None:
+        params["end_time"] = ensure_utc(end_time).isoformat()
+
+    response = await timed_get(
+        f"/{ADAFRUIT_USERNAME}/feeds/{feed}/data", params=params
     )
 
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"Adafruit HTTP {response.status_code} for feed '{feed}' data page"
+        )
 
-# ======================
-# Core processing logic
-# ======================
+    page = response.json()
+    if not isinstance(page, list):
+        raise RuntimeError(f"Unexpected data page for feed '{feed}'")
+    return page
 
-async def process_feed(
-    metric: str,
-) -> Optional[Tuple[str, float, datetime]]:
-    """
-    Returns (metric, value, timestamp) if data exists (new or duplicate),
-    otherwise None.
-    """
 
-    data = await fetch_latest(metric)
-    if not data:
+async def fetch_group(group: str) -> Optional[dict]:
+    response = await timed_get(f"/{ADAFRUIT_USERNAME}/groups/{group}")
+
+    if response.status_code != 200:
+        print(f"⚠️ Adafruit HTTP {response.status_code} for group '{group}'")
+        return None
+
+    try:
+        return response.json()
+    except Exception:
+        print(f"⚠️ Invalid JSON for group '{group}'")
         return None
 
+
+def parse_point(data: dict) -> Optional[Tuple[float, datetime]]:
     try:
         value = float(data["value"])
         timestamp = datetime.fromisoformat(
             data["created_at"].replace("Z", "+00:00")
         )
-    except (KeyError, ValueError):
+    except (KeyError, ValueError, TypeError, AttributeError):
         return None
+    return value, ensure_utc(timestamp)
+
+
+# ======================
+# Ingest state helpers
+# ======================
+
+def get_last_timestamp(metric: str) -> Optional[datetime]:
+    return watermarks.get(metric)
 
-    last_ts = await get_last_timestamp(metric)
+def update_last_timestamp(metric: str, timestamp: datetime) -> None:
+    watermarks.set(metric, timestamp)
 
+
+# ======================
+# Core processing logic
+# ======================
+
+async def handle_point(metric: str, value: float, timestamp: datetime) -> bool:
+    """
+    Dedupe against the watermark, then persist and broadcast.
+    Shared by the REST poller and the MQTT subscriber.
+    Returns True if the point was new.
+    """
     timestamp = ensure_utc(timestamp)
 
+    last_ts = get_last_timestamp(metric)
+
     if last_ts:
         last_ts = ensure_utc(last_ts)
         if timestamp <= last_ts:
-            return metric, value, timestamp
+            return False
 
-    # Persist
-    await mongo.client["IoT_"][metric].insert_one(  # type: ignore
+    # Persist; the watermark only moves once the row is stored,
+    # so a failed flush is fetched again on the next poll
+    written = await write_buffer.put(
+        metric,
         {
             "value": value,
             "timestamp": timestamp,
-        }
+            "source": SOURCE,
+        },
     )
+    if not await written:
+        raise RuntimeError(f"Write of '{metric}' point failed")
 
-    await update_last_timestamp(metric, timestamp)
+    update_last_timestamp(metric, timestamp)
 
     await manager.broadcast(
         {
@@ -131,28 +291,545 @@ async def process_feed(
         }
     )
 
+    return True
+
+
+async def process_feed(
+    metric: str,
+) -> Optional[Tuple[str, float, datetime]]:
+    """
+    Returns (metric, value, timestamp) if data exists (new or duplicate),
+    otherwise None.
+    """
+
+    data = await fetch_latest(metric)
+    if not data:
+        scheduler.record(metric, new=False)
+        return None
+
+    _last_polled[metric] = time.monotonic()
+
+    point = parse_point(data)
+    if point is None:
+        scheduler.record(metric, new=False)
+        return None
+    value, timestamp = point
+
+    new = await handle_point(metric, value, timestamp)
+    scheduler.record(metric, new=new)
+
     return metric, value, timestamp
 
 
+# ======================
+# Group fetch
+# ======================
+
+GROUP_PREFIX = "group:"
+
+# group key -> {metric: full feed key} seen in its last response
+_group_members: Dict[str, Dict[str, str]] = {}
+
+
+def feed_metric(feed_key: str) -> str:
+    """
+    Feeds inside a group are keyed "<group>.<feed>"; the metric is the feed part.
+    """
+    return feed_key.rsplit(".", 1)[-1]
+
+
+def feed_key(metric: str) -> str:
+    """
+    Full Adafruit key of a configured feed: "<group>.<feed>" once it is
+    known to belong to a group, else the bare metric.
+    """
+    for members in _group_members.values():
+        if metric in members:
+            return members[metric]
+    return metric
+
+
+def poll_units(metrics: List[str]) -> List[str]:
+    """
+    What one poll cycle fetches: each configured group once, plus any
+    feed not (yet) known to belong to one of those groups.
+    """
+    grouped = set().union(*_group_members.values()) if _group_members else set()
+    return (
+        [f"{GROUP_PREFIX}{group}" for group in ADAFRUIT_GROUPS]
+        + [m for m in metrics if m not in grouped]
+    )
+
+
+def group_members(data: dict, metrics: List[str]) -> Dict[str, str]:
+    wanted = set(metrics)
+    members: Dict[str, str] = {}
+    for feed in data.get("feeds") or []:
+        feed_key = str(feed.get("key", ""))
+        metric = feed_metric(feed_key)
+        if metric in wanted:
+            members[metric] = feed_key
+    return members
+
+
+async def load_group_members(group: str, metrics: List[str]) -> bool:
+    """
+    Learn which feeds a group holds without ingesting anything, so the
+    first backfill already uses the full "<group>.<feed>" keys.
+    """
+    data = await fetch_group(group)
+    if not data:
+        return False
+    _group_members[group] = group_members(data, metrics)
+    return True
+
+
+async def process_group(
+    group: str,
+    metrics: List[str],
+) -> List[Tuple[str, float, datetime]]:
+    """
+    One request for the whole group, split into per-metric points.
+    Uses each feed's last_value and the time it was last updated.
+    """
+    unit = f"{GROUP_PREFIX}{group}"
+
+    data = await fetch_group(group)
+    if not data:
+        scheduler.record(unit, new=False)
+        return []
+
+    polled_at = time.monotonic()
+    members = group_members(data, metrics)
+    results: List[Tuple[str, float, datetime]] = []
+    any_new = False
+
+    for feed in data.get("feeds") or []:
+        metric = feed_metric(str(feed.get("key", "")))
+        if metric not in members:
+            continue
+
+        _last_polled[metric] = polled_at
+
+        point = parse_point({
+            "value": feed.get("last_value"),
+            "created_at": feed.get("last_value_at") or feed.get("updated_at"),
+        })
+        if point is None:
+            continue
+        value, timestamp = point
+
+        any_new |= await handle_point(metric, value, timestamp)
+        results.append((metric, value, timestamp))
+
+    _group_members[group] = members
+    scheduler.record(unit, new=any_new)
+
+    return results
+
+
+# ======================
+# Catch-up backfill
+# ======================
+
+# monotonic time of each feed's last successful poll
+_last_polled: Dict[str, float] = {}
+
+
+def needs_backfill(metric: str, unit: Optional[str] = None) -> bool:
+    """
+    Backfill on the first poll after startup and whenever the feed's
+    last successful poll is more than the gap limit older than its poll
+    interval allows. unit is what the scheduler polls the feed as (its
+    group, for grouped feeds); a feed that has backed off is polled
+    rarely on purpose and that alone is not a gap.
+    """
+    if not BACKFILL_ENABLED:
+        return False
+    last = _last_polled.get(metric)
+    if last is None:
+        return True
+    allowed = scheduler.interval(unit or metric) + BACKFILL_GAP_SECONDS
+    return time.monotonic() - last > allowed
+
+
+async def stored_timestamps(metric: str, docs: List[dict]) -> set:
+    stamps = [doc["timestamp"] for doc in docs]
+    cursor = metric_store.collection(metric).find(
+        metric_store.match(metric, {"timestamp": {"$gte": min(stamps), "$lte": max(stamps)}}),
+        {"_id": 0, "timestamp": 1},
+    )
+    return {ensure_utc(doc["timestamp"]) async for doc in cursor}
+
+
+async def insert_backfill_page(metric: str, docs: List[dict]) -> List[dict]:
+    """
+    Drops timestamps already stored in the page's range, then
+    insert_many(ordered=False). Time-series collections (and rows
+    written before the source field existed) have no unique index, so
+    the lookup is what keeps retried or overlapping pages out; the
+    index still catches races. Returns the new docs.
+    """
+    existing = await stored_timestamps(metric, docs)
+    docs = [doc for doc in docs if doc["timestamp"] not in existing]
+    if not docs:
+        return []
+
+    try:
+        await metric_store.insert_many(metric, docs, ordered=False)
+        inserted = docs
+    except BulkWriteError as e:
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+        inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+
+    if inserted:
+        history_cache.invalidate_docs(metric, inserted)
+        await rollups.apply(metric, inserted)
+    return inserted
+
+
+async def fetch_dense_window(
+    feed: str,
+    since: datetime,
+    end: datetime,
+    page: List[dict],
+) -> List[dict]:
+    """
+    Every point in (since, end] when even the smallest window holds more
+    than a page: /data returns newest first, so keep moving end_time back
+    to the oldest point of the previous page until a page comes back
+    short. page is the full first page, already fetched.
+    """
+    points: Dict[datetime, dict] = {}
+    previous: Optional[datetime] = None
+
+    for _ in range(BACKFILL_MAX_PAGES):
+        stamps = []
+        for raw in page:
+            point = parse_point(raw)
+            if point is not None:
+                points.setdefault(point[1], raw)
+                stamps.append(point[1])
+
+        if len(page) < BACKFILL_PAGE_SIZE:
+            return list(points.values())
+
+        oldest = min(stamps, default=since)
+        if oldest <= since:
+            # Reached the start of the window
+            return list(points.values())
+        if previous is not None and oldest >= previous:
+            # More points share one timestamp than fit in a page
+            break
+        previous = oldest
+        page = await fetch_data_page(feed, since, oldest, BACKFILL_PAGE_SIZE)
+
+    print(
+        f"⚠️ Backfill of '{feed}' could not page through {since.isoformat()}"
+        f" – {end.isoformat()}; some points in it may be missing"
+    )
+    return list(points.values())
+
+
+async def backfill_feed(metric: str, feed_key: Optional[str] = None) -> bool:
+    """
+    Walk /data from the feed's watermark up to now, oldest first, one
+    time window per request, and bulk-insert whatever was missed. A full
+    page means the window was too dense, so it is halved and retried.
+    A window that is full even at one second is paged through backward
+    with end_time. The watermark moves after every stored window, so an
+    interrupted backfill resumes where it stopped. Returns True once
+    caught up.
+    """
+    since = get_last_timestamp(metric)
+    if since is None:
+        # Nothing to catch up from; the regular poll seeds the watermark
+        return True
+
+    await index_manager.ensure_metric(metric)
+
+    since = ensure_utc(since)
+    until = datetime.now(timezone.utc)
+    window = timedelta(seconds=BACKFILL_WINDOW)
+    inserted = 0
+
+    for _ in range(BACKFILL_MAX_PAGES):
+        if since >= until:
+            break
+
+        end = min(since + window, until)
+        # One second of overlap in case end_time is exclusive
+        page = await fetch_data_page(
+            feed_key or metric, since, end + timedelta(seconds=1), BACKFILL_PAGE_SIZE
+        )
+
+        if len(page) >= BACKFILL_PAGE_SIZE:
+            if window > BACKFILL_MIN_WINDOW:
+                window /= 2
+                continue
+            page = await fetch_dense_window(feed_key or metric, since, end, page)
+
+        docs = [
+            {"value": value, "timestamp": ts, "source": SOURCE}
+            for value, ts in (p for p in map(parse_point, page) if p is not None)
+            if since < ts <= end
+        ]
+
+        if docs:
+            new_docs = await insert_backfill_page(metric, docs)
+            inserted += len(new_docs)
+
+            if new_docs:
+                await manager.broadcast({
+                    "type": "batch",
+                    "samples": [
+                        {
+                            "metric": metric,
+                            "value": doc["value"],
+                            "timestamp": doc["timestamp"].isoformat(),
+                        }
+                        for doc in sorted(new_docs, key=lambda d: d["timestamp"])
+                    ],
+                })
+
+        if end < until:
+            # Everything up to end is stored
+            update_last_timestamp(metric, end)
+        elif docs:
+            # Last window: stop at the newest point, not the clock
+            update_last_timestamp(metric, max(doc["timestamp"] for doc in docs))
+        since = end
+
+        if len(page) < BACKFILL_PAGE_SIZE // 4:
+            window *= 2
+    else:
+        if since < until:
+            print(f"⚠️ Backfill for '{metric}' paused after {BACKFILL_MAX_PAGES} pages, resuming next cycle")
+
+    if inserted:
+        print(f"⏪ Backfilled {inserted} point(s) for '{metric}'")
+
+    return since >= until
+
+
+# ======================
+# Concurrent polling
+# ======================
+
+async def poll_feeds(
+    units: List[str],
+    metrics: List[str],
+) -> List[Tuple[str, float, datetime]]:
+    """
+    Poll every unit (a feed, or "group:<key>") at once, at most
+    POLL_CONCURRENCY in flight. A slow or failing unit is timed out and
+    reported on its own, so the cycle takes as long as the slowest
+    unit, not the sum.
+    """
+    semaphore = asyncio.Semaphore(POLL_CONCURRENCY)
+
+    async def backfill_if_needed(
+        metric: str,
+        unit: str,
+        feed_key: Optional[str] = None,
+    ) -> bool:
+        if not needs_backfill(metric, unit):
+            return True
+        # On failure the unit is skipped this cycle, so the latest
+        # point cannot move the watermark past an unfilled gap.
+        return await asyncio.wait_for(
+            backfill_feed(metric, feed_key), BACKFILL_TIMEOUT
+        )
+
+    async def poll_one(unit: str):
+        async with semaphore:
+            if unit.startswith(GROUP_PREFIX):
+                group = unit[len(GROUP_PREFIX):]
+                if group not in _group_members:
+                    # Membership first, or the startup backfill is skipped
+                    await asyncio.wait_for(
+                        load_group_members(group, metrics), FEED_TIMEOUT
+                    )
+                caught_up = True
+                for metric, feed_key in _group_members.get(group, {}).items():
+                    caught_up &= await backfill_if_needed(metric, unit, feed_key)
+                if not caught_up:
+                    # Still walking the gap; the latest point would skip it
+                    return []
+                return await asyncio.wait_for(
+                    process_group(group, metrics), FEED_TIMEOUT
+                )
+
+            if not await backfill_if_needed(unit, unit):
+                return []
+            result = await asyncio.wait_for(process_feed(unit), FEED_TIMEOUT)
+            return [result] if result else []
+
+    outcomes = await asyncio.gather(
+        *(poll_one(unit) for unit in units),
+        return_exceptions=True,
+    )
+
+    results: List[Tuple[str, float, datetime]] = []
+
+    for unit, outcome in zip(units, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            print(f"⚠️ Feed '{unit}' timed out")
+        elif isinstance(outcome, RateLimited):
+            print(f"⚠️ Feed '{unit}' skipped: {outcome}")
+        elif isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        elif isinstance(outcome, BaseException):
+            print(f"⚠️ Feed '{unit}' error:", repr(outcome))
+        else:
+            results.extend(outcome)
+
+    return results
+
+
+# ======================
+# MQTT push mode
+# ======================
+
+def parse_mqtt_payload(payload: bytes) -> Optional[Tuple[float, datetime]]:
+    """
+    Accepts a bare value (what gateway.py publishes) or a JSON
+    data record with value/created_at. Bare values are stamped
+    with the receive time.
+    """
+    try:
+        text = payload.decode().strip()
+    except UnicodeDecodeError:
+        return None
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = text
+
+    if isinstance(data, dict):
+        if "created_at" in data:
+            return parse_point(data)
+        data = data.get("value")
+
+    try:
+        value = float(data)  # type: ignore
+    except (TypeError, ValueError):
+        return None
+
+    return value, datetime.now(timezone.utc)
+
+
+async def consume_mqtt(subscriber: MqttSubscriber, metrics: List[str]) -> None:
+    feeds = set(metrics)
+
+    while True:
+        topic, payload = await subscriber.queue.get()
+
+        # Grouped feeds publish on .../feeds/<group>.<feed>
+        metric = feed_metric(topic.rsplit("/", 1)[-1])
+        if metric not in feeds:
+            continue
+
+        point = parse_mqtt_payload(payload)
+        if point is None:
+            print(f"⚠️ Unparseable MQTT payload on '{topic}'")
+            continue
+
+        try:
+            await handle_point(metric, *point)
+        except Exception as e:
+            print(f"⚠️ MQTT feed '{metric}' error:", repr(e))
+
+
+def feeds_to_poll(
+    metrics: List[str],
+    subscriber: Optional[MqttSubscriber],
+) -> List[str]:
+    """
+    Without MQTT (or while it is disconnected) the adaptive scheduler
+    decides. With MQTT connected, nothing is polled except one
+    catch-up cycle over every feed right after each (re)connect.
+    """
+    units = poll_units(metrics)
+
+    if subscriber is None or not subscriber.connected.is_set():
+        return scheduler.take_due(units)
+    if subscriber.reconnected.is_set() and not scheduler.paused():
+        subscriber.reconnected.clear()
+        return units
+    return []
+
+
 # ======================
 # Gateway main loop
 # ======================
 
 async def start_adafruit_gateway() -> None:
-    print("🌉 Adafruit gateway started")
+    print(f"🌉 Adafruit gateway started ({GATEWAY_MODE} mode)")
+
+    metrics = [m.strip() for m in ADAFRUIT_FEEDS if m.strip()]
+
+    flusher: Optional[asyncio.Task] = None
+    consumer: Optional[asyncio.Task] = None
+    subscriber: Optional[MqttSubscriber] = None
+    try:
+        while not watermarks.loaded:
+            try:
+                await watermarks.load()
+            except Exception as e:
+                print("⚠️ Watermark load error:", repr(e))
+                await asyncio.sleep(GATEWAY_INTERVAL)
 
+        flusher = asyncio.create_task(watermarks.run_flusher())
+
+        # Known group members are not polled (or backfilled) by bare key
+        for group in ADAFRUIT_GROUPS:
+            try:
+                await load_group_members(group, metrics)
+            except Exception as e:
+                print(f"⚠️ Group '{group}' membership not loaded:", repr(e))
+
+        if GATEWAY_MODE == "mqtt":
+            # Group members were loaded above, so grouped feeds are
+            # subscribed under their full keys
+            subscriber = MqttSubscriber(
+                host=MQTT_HOST,
+                port=MQTT_PORT,
+                topics=[f"{ADAFRUIT_USERNAME}/feeds/{feed_key(m)}" for m in metrics],
+                username=ADAFRUIT_USERNAME,
+                password=ADAFRUIT_KEY,
+                tls=MQTT_TLS,
+            )
+            subscriber.start()
+            consumer = asyncio.create_task(consume_mqtt(subscriber, metrics))
+
+        await run_gateway_loop(metrics, subscriber)
+    finally:
+        for task in (consumer, flusher):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if subscriber is not None:
+            subscriber.stop()
+        await close_http_client()
+
+
+async def run_gateway_loop(
+    metrics: List[str],
+    subscriber: Optional[MqttSubscriber] = None,
+) -> None:
     while True:
         try:
             if mongo.client is None:
                 await asyncio.sleep(GATEWAY_INTERVAL)
                 continue
 
-            results: List[Tuple[str, float, datetime]] = []
-
-            for metric in [m.strip() for m in ADAFRUIT_FEEDS if m.strip()]:
-                result = await process_feed(metric)
-                if result:
-                    results.append(result)
+            due = feeds_to_poll(metrics, subscriber)
+            results = await poll_feeds(due, metrics) if due else []
 
             if results:
                 print("📊 Gateway snapshot:")
@@ -167,4 +844,7 @@ async def start_adafruit_gateway() -> None:
             print("⚠️ Gateway error:", repr(e))
             traceback.print_exc()
 
-        await asyncio.sleep(GATEWAY_INTERVAL)
\ No newline at end of file
+        if subscriber is not None and subscriber.connected.is_set():
+            await asyncio.sleep(GATEWAY_INTERVAL)
+        else:
+            await asyncio.sleep(scheduler.seconds_until_next(poll_units(metrics)))
\ No newline at end of file
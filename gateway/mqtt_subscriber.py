@@ -0,0 +1,97 @@
+# gateway/mqtt_subscriber.py
+import asyncio
+import ssl
+from typing import List, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+
+class MqttSubscriber:
+    """
+    Thin asyncio bridge over paho-mqtt.
+
+    paho runs its network loop in its own thread; every message is handed
+    to the event loop with call_soon_threadsafe and queued as
+    (topic, payload). Reconnects are handled by paho itself.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        topics: List[str],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        tls: bool = False,
+        keepalive: int = 60,
+        queue_size: int = 10000,
+    ):
+        self.host = host
+        self.port = port
+        self.topics = topics
+        self.keepalive = keepalive
+
+        self.queue: asyncio.Queue[Tuple[str, bytes]] = asyncio.Queue(maxsize=queue_size)
+        self.connected = asyncio.Event()
+        self.reconnected = asyncio.Event()
+        self.dropped = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._client = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+        if username:
+            self._client.username_pw_set(username, password)
+        if tls:
+            self._client.tls_set(cert_reqs=ssl.CERT_REQUIRED)
+        self._client.reconnect_delay_set(min_delay=1, max_delay=30)
+
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_message = self._on_message
+
+    # ----------------------
+    # Lifecycle
+    # ----------------------
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._client.connect_async(self.host, self.port, keepalive=self.keepalive)
+        self._client.loop_start()
+
+    def stop(self) -> None:
+        self._client.disconnect()
+        self._client.loop_stop()
+
+    # ----------------------
+    # paho callbacks (network thread)
+    # ----------------------
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            print(f"⚠️ MQTT connect refused: {reason_code}")
+            return
+
+        client.subscribe([(topic, 0) for topic in self.topics])
+        print(f"📡 MQTT connected to {self.host}:{self.port}")
+        self._loop.call_soon_threadsafe(self._set_connected)  # type: ignore
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        print(f"⚠️ MQTT disconnected: {reason_code}")
+        self._loop.call_soon_threadsafe(self.connected.clear)  # type: ignore
+
+    def _on_message(self, client, userdata, msg):
+        self._loop.call_soon_threadsafe(self._enqueue, msg.topic, msg.payload)  # type: ignore
+
+    # ----------------------
+    # Event loop side
+    # ----------------------
+
+    def _set_connected(self) -> None:
+        self.connected.set()
+        self.reconnected.set()
+
+    def _enqueue(self, topic: str, payload: bytes) -> None:
+        try:
+            self.queue.put_nowait((topic, payload))
+        except asyncio.QueueFull:
+            self.dropped += 1
@@ -0,0 +1,180 @@
+# gateway/scheduler.py
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+POLL_INTERVAL = float(os.getenv("ADAFRUIT_POLL_INTERVAL", "3"))
+MIN_POLL_INTERVAL = float(os.getenv("ADAFRUIT_MIN_POLL_INTERVAL", "1"))
+MAX_POLL_INTERVAL = float(os.getenv("ADAFRUIT_MAX_POLL_INTERVAL", "300"))
+REQUESTS_PER_MINUTE = float(os.getenv("ADAFRUIT_REQUESTS_PER_MINUTE", "60"))
+DEFAULT_RETRY_AFTER = 60.0
+
+
+class RateLimited(Exception):
+    """
+    Adafruit answered 429; retry_after is in seconds.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    try:
+        return max(0.0, float(value))  # type: ignore
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+@dataclass
+class FeedSchedule:
+    interval: float
+    next_due: float = 0.0
+    polls: int = 0
+    new_points: int = 0
+
+
+class PollScheduler:
+    """
+    Per-feed adaptive poll intervals under a global request budget.
+
+    A feed that keeps returning new points has its interval halved
+    (down to min_interval); a feed that returns duplicates backs off
+    exponentially (up to max_interval). Every request made against
+    Adafruit spends one token from a requests-per-minute bucket, and a
+    429 pauses all polling until its Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = POLL_INTERVAL,
+        min_interval: float = MIN_POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+    ):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.capacity = requests_per_minute
+        self.refill_rate = requests_per_minute / 60
+
+        self.feeds: Dict[str, FeedSchedule] = {}
+        self.tokens = requests_per_minute
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self._refilled_at = time.monotonic()
+
+    # ----------------------
+    # Budget
+    # ----------------------
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self._refilled_at) * self.refill_rate,
+        )
+        self._refilled_at = now
+
+    def note_request(self) -> None:
+        """
+        Spend one token; may go negative when backfills burst.
+        """
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def pause(self, retry_after: float) -> None:
+        self.rate_limited += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        print(f"⏸️ Adafruit rate limit hit, pausing polls for {retry_after:.0f}s")
+
+    def paused(self) -> bool:
+        return time.monotonic() < self.paused_until
+
+    # ----------------------
+    # Scheduling
+    # ----------------------
+
+    def _feed(self, metric: str) -> FeedSchedule:
+        if metric not in self.feeds:
+            self.feeds[metric] = FeedSchedule(interval=self.base_interval)
+        return self.feeds[metric]
+
+    def interval(self, metric: str) -> float:
+        """
+        Current poll interval of a feed (or group unit).
+        """
+        return self._feed(metric).interval
+
+    def take_due(self, metrics: List[str]) -> List[str]:
+        """
+        Feeds whose interval has elapsed, most overdue first,
+        trimmed to what the budget allows right now.
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return []
+
+        self._refill(now)
+
+        due = sorted(
+            (m for m in metrics if self._feed(m).next_due <= now),
+            key=lambda m: self.feeds[m].next_due,
+        )
+        due = due[:max(0, int(self.tokens))]
+
+        for metric in due:
+            # Provisional; record() reschedules from the actual outcome
+            self.feeds[metric].next_due = now + self.feeds[metric].interval
+
+        return due
+
+    def record(self, metric: str, new: bool) -> None:
+        feed = self._feed(metric)
+        feed.polls += 1
+
+        if new:
+            feed.new_points += 1
+            feed.interval = max(self.min_interval, feed.interval / 2)
+        else:
+            feed.interval = min(self.max_interval, feed.interval * 2)
+
+        feed.next_due = time.monotonic() + feed.interval
+
+    def seconds_until_next(self, metrics: List[str]) -> float:
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        next_due = min(
+            (self._feed(m).next_due for m in metrics),
+            default=now + self.base_interval,
+        )
+        wait = next_due - now
+
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.refill_rate)
+
+        return min(max(wait, 0.05), self.max_interval)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "tokens": round(self.tokens, 2),
+            "requests_per_minute": self.capacity,
+            "paused_for": round(max(0.0, self.paused_until - now), 1),
+            "rate_limited": self.rate_limited,
+            "feeds": {
+                metric: {
+                    "interval": round(feed.interval, 2),
+                    "due_in": round(max(0.0, feed.next_due - now), 2),
+                    "polls": feed.polls,
+                    "new_points": feed.new_points,
+                }
+                for metric, feed in self.feeds.items()
+            },
+        }
+
+
+scheduler = PollScheduler()
@@ -0,0 +1,91 @@
+# gateway/watermarks.py
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from data.mongo import mongo
+from helper.timeutils import ensure_utc
+
+WATERMARK_FLUSH_INTERVAL = float(os.getenv("WATERMARK_FLUSH_INTERVAL", "5"))
+
+
+class WatermarkCache:
+    """
+    In-process copy of ingest_state.
+
+    Loaded once with a single find(), read from memory on every poll,
+    and written back to Mongo in one bulk_write every flush interval.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, datetime] = {}
+        self._dirty: set[str] = set()
+        self.loaded = False
+
+    async def load(self) -> None:
+        cursor = mongo.client["IoT_"]["ingest_state"].find(  # type: ignore
+            {}, {"_id": 0, "metric": 1, "last_timestamp": 1}
+        )
+        async for doc in cursor:
+            ts = doc.get("last_timestamp")
+            if doc.get("metric") and isinstance(ts, datetime):
+                self._values[doc["metric"]] = ensure_utc(ts)
+
+        self.loaded = True
+        print(f"💧 Loaded {len(self._values)} ingest watermarks")
+
+    def get(self, metric: str) -> Optional[datetime]:
+        return self._values.get(metric)
+
+    def set(self, metric: str, timestamp: datetime) -> None:
+        timestamp = ensure_utc(timestamp)
+        current = self._values.get(metric)
+        if current is not None and timestamp <= current:
+            return
+        self._values[metric] = timestamp
+        self._dirty.add(metric)
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        ops = [
+            UpdateOne(
+                {"metric": metric},
+                {"$max": {"last_timestamp": self._values[metric]}},
+                upsert=True,
+            )
+            for metric in dirty
+        ]
+
+        try:
+            await mongo.client["IoT_"]["ingest_state"].bulk_write(  # type: ignore
+                ops, ordered=False
+            )
+        except Exception:
+            # Retry on the next flush
+            self._dirty |= dirty
+            raise
+
+    async def run_flusher(self, interval: float = WATERMARK_FLUSH_INTERVAL) -> None:
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print("⚠️ Watermark flush error:", repr(e))
+        finally:
+            # Never let shutdown fail here: the gateway and lifespan
+            # still have clients and the write buffer to close
+            try:
+                await self.flush()
+            except Exception as e:
+                print("⚠️ Final watermark flush error:", repr(e))
+
+
+watermarks = WatermarkCache()
@@ -0,0 +1,10 @@
+from datetime import datetime, timezone
+
+
+def ensure_utc(dt: datetime) -> datetime:
+    """
+    Ensure datetime is timezone-aware in UTC.
+    """
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
@@ -7,16 +7,23 @@ import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 
 
+from data.indexes import index_manager
 from data.mongo import mongo
+from data.write_buffer import write_buffer
 from controller.AuthController import router as auth_router
 from controller.SystemController import router as system_router
 from gateway.adafruit_gateway import start_adafruit_gateway
 from controller.RealTimeController import router as rt_router
 from controller.IngestController import router as ingest_router
 from controller.HistoryController import router as history_router
+from realtime.bus import create_bus
+from realtime.connection_manager import manager
 
 load_dotenv()
 
+# How often a worker without the gateway role retries taking it over
+GATEWAY_CLAIM_RETRY = 5
+
 
 # ======================
 # MongoDB wait helper
@@ -35,6 +42,14 @@ async def wait_for_mongo(client, retries: int = 10, delay: int = 1):
     raise RuntimeError("MongoDB not available after retries")
 
 
+async def run_gateway(bus) -> None:
+    # With several workers on one bus only one may poll Adafruit,
+    # otherwise clients would get every point once per worker
+    while not bus.claim("gateway"):
+        await asyncio.sleep(GATEWAY_CLAIM_RETRY)
+    await start_adafruit_gateway()
+
+
 # ======================
 # FastAPI lifespan
 # ======================
@@ -53,14 +68,35 @@ async def lifespan(app: FastAPI):
     # Wait until Mongo is usable
     await wait_for_mongo(mongo.client)
 
-    # 2️⃣ Start Adafruit Gateway
-    gateway_task = asyncio.create_task(start_adafruit_gateway())
+    # Indexes for history, login and watermark queries
+    try:
+        await index_manager.ensure_startup()
+    except Exception as e:
+        print("⚠️ Index setup failed:", repr(e))
+
+    # 2️⃣ Start group-commit write buffer
+    write_buffer.start()
+
+    # 3️⃣ Realtime fan-out bus (cross-worker when REALTIME_BUS=unix)
+    bus = create_bus()
+    await manager.start_bus(bus)
+
+    # 4️⃣ Start Adafruit Gateway (in one worker only)
+    gateway_task = asyncio.create_task(run_gateway(bus))
 
     yield
 
-    # 3️⃣ Shutdown
+    # 5️⃣ Shutdown
     print("🛑 LIFESPAN SHUTDOWN")
     gateway_task.cancel()
+    try:
+        await gateway_task
+    except asyncio.CancelledError:
+        pass
+
+    # Flush buffered writes before the client goes away
+    await write_buffer.stop()
+    await manager.stop_bus()
     await mongo.client.close()
 
 
@@ -1,4 +1,4 @@
-from typing import Union, Literal
+from typing import List, Union, Literal
 from pydantic import BaseModel, EmailStr, Field
 from enum import Enum
 from typing import Optional
@@ -47,4 +47,23 @@ class HistoryRecord(BaseModel):
     metric: str
     value: float
     timestamp: datetime
-    timestamp_local: Optional[datetime] = None
\ No newline at end of file
+    timestamp_local: Optional[datetime] = None
+
+
+class IngestSample(BaseModel):
+    metric: str = Field(min_length=1)
+    value: float
+    timestamp: Optional[datetime] = None   # defaults to server receive time
+
+
+class HistoryPage(BaseModel):
+    items: List[HistoryRecord]
+    next_cursor: Optional[str] = None   # None on the last page
+
+
+class HistoryBucket(BaseModel):
+    timestamp: datetime             # bucket start (UTC)
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: Optional[int] = None
@@ -0,0 +1,175 @@
+# realtime/binary_protocol.py
+"""
+Opt-in binary frames for /ws/metrics.
+
+One frame carries a batch of samples column by column (little-endian):
+
+    magic     2s   b"IB"
+    version   u8   1
+    flags     u8   bit0 = float64 values, bit1 = u16 metric ids
+    kind      u8   0 = live, 1 = snapshot
+    n_metrics u16  then per metric: u8 length + UTF-8 name
+    n         u32  sample count
+    base_ts   i64  epoch milliseconds of the first sample
+    ids       n x u8 (or u16)      index into the metric table
+    ts        n x zigzag varint    delta from the previous timestamp
+    values    n x f32 (or f64)
+
+Timestamps are millisecond precision; naive ISO strings are read as UTC.
+A float32 frame switches to float64 when a finite value does not fit.
+Metric names longer than 255 UTF-8 bytes are rejected with ValueError.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import math
+import struct
+
+MAGIC = b"IB"
+VERSION = 1
+
+FLAG_FLOAT64 = 0x01
+FLAG_WIDE_IDS = 0x02
+
+KIND_LIVE = 0
+KIND_SNAPSHOT = 1
+
+_HEADER = struct.Struct("<2sBBBH")
+_COUNTS = struct.Struct("<Iq")
+
+# Largest finite float32
+FLOAT32_MAX = 3.4028234663852886e38
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MS = timedelta(milliseconds=1)
+
+
+def to_epoch_ms(timestamp) -> int:
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - _EPOCH) // _MS
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    # zigzag so small negative deltas stay small
+    n = (n << 1) ^ (n >> 63)
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: bytes, pos: int):
+    shift = result = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), pos
+
+
+def encode_samples(
+    samples: List[dict],
+    float64: bool = False,
+    kind: int = KIND_LIVE,
+) -> bytes:
+    """
+    Encode {"metric", "value", "timestamp"} dicts into one binary frame.
+    """
+    table: Dict[str, int] = {}
+    ids: List[int] = []
+    stamps: List[int] = []
+    values: List[float] = []
+
+    for sample in samples:
+        metric = sample["metric"]
+        if metric not in table:
+            table[metric] = len(table)
+        ids.append(table[metric])
+        stamps.append(to_epoch_ms(sample["timestamp"]))
+        values.append(float(sample["value"]))
+
+    if not float64 and any(
+        math.isfinite(v) and abs(v) > FLOAT32_MAX for v in values
+    ):
+        float64 = True
+
+    names = [metric.encode() for metric in table]
+    for name in names:
+        if len(name) > 0xFF:
+            raise ValueError("Metric name longer than 255 bytes")
+
+    wide = len(table) > 0xFF
+    flags = (FLAG_FLOAT64 if float64 else 0) | (FLAG_WIDE_IDS if wide else 0)
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, flags, kind, len(table)))
+    for name in names:
+        out.append(len(name))
+        out += name
+
+    base = stamps[0] if stamps else 0
+    out += _COUNTS.pack(len(samples), base)
+
+    n = len(samples)
+    out += struct.pack(f"<{n}{'H' if wide else 'B'}", *ids)
+
+    previous = base
+    for ts in stamps:
+        _write_varint(out, ts - previous)
+        previous = ts
+
+    out += struct.pack(f"<{n}{'d' if float64 else 'f'}", *values)
+    return bytes(out)
+
+
+def decode_samples(data: bytes) -> dict:
+    """
+    Reference decoder. Returns {"kind": ..., "samples": [...]} with
+    ISO-8601 UTC timestamps plus the raw epoch-millisecond "ts".
+    """
+    magic, version, flags, kind, n_metrics = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an IB v1 frame")
+    pos = _HEADER.size
+
+    metrics: List[str] = []
+    for _ in range(n_metrics):
+        length = data[pos]
+        metrics.append(data[pos + 1:pos + 1 + length].decode())
+        pos += 1 + length
+
+    n, base = _COUNTS.unpack_from(data, pos)
+    pos += _COUNTS.size
+
+    id_fmt = "H" if flags & FLAG_WIDE_IDS else "B"
+    ids = struct.unpack_from(f"<{n}{id_fmt}", data, pos)
+    pos += n * struct.calcsize(id_fmt)
+
+    stamps: List[int] = []
+    ts = base
+    for _ in range(n):
+        delta, pos = _read_varint(data, pos)
+        ts += delta
+        stamps.append(ts)
+
+    value_fmt = "d" if flags & FLAG_FLOAT64 else "f"
+    values = struct.unpack_from(f"<{n}{value_fmt}", data, pos)
+
+    return {
+        "kind": "snapshot" if kind == KIND_SNAPSHOT else "live",
+        "samples": [
+            {
+                "metric": metrics[i],
+                "value": value,
+                "ts": ms,
+                "timestamp": datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(),
+            }
+            for i, ms, value in zip(ids, stamps, values)
+        ],
+    }
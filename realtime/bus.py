@@ -0,0 +1,252 @@
+# realtime/bus.py
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import fcntl
+import json
+import os
+import socket
+import time
+
+# "inproc": single process (default)
+# "unix":   relay between uvicorn workers on the same host
+REALTIME_BUS = os.getenv("REALTIME_BUS", "inproc").lower()
+REALTIME_BUS_DIR = os.getenv("REALTIME_BUS_DIR", "/tmp/iot-realtime-bus")
+# Well under the default socket send buffer (~208 KiB on Linux)
+REALTIME_BUS_MAX_DATAGRAM = int(os.getenv("REALTIME_BUS_MAX_DATAGRAM", str(64 * 1024)))
+
+Deliver = Callable[[dict], Awaitable[None]]
+
+
+class BroadcastBus(ABC):
+    """
+    Carries broadcast messages to every worker's ConnectionManager.
+    publish() is called by whoever produced the message; the bus calls
+    the bound deliver() in each worker, including the publishing one.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def bind(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, message: dict) -> None:
+        ...
+
+    def claim(self, role: str) -> bool:
+        """
+        True if this worker should run a singleton task (e.g. the
+        Adafruit gateway). A single process always holds every role.
+        """
+        return True
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+class InProcessBus(BroadcastBus):
+    async def publish(self, message: dict) -> None:
+        await self._deliver(message)  # type: ignore
+
+
+class UnixSocketBus(BroadcastBus):
+    """
+    Local pub/sub over Unix datagram sockets.
+
+    Each worker binds <dir>/<pid>.sock and publishing sends the message
+    to every other socket in the directory, so all workers relay every
+    message to their own clients. Batches too large for one datagram
+    are split into smaller batches. Sockets of dead workers are removed
+    the first time a send to them is refused.
+    """
+
+    PEER_REFRESH_SECONDS = 1.0
+    SEND_RETRIES = 6
+
+    def __init__(
+        self,
+        directory: str = REALTIME_BUS_DIR,
+        max_datagram: int = REALTIME_BUS_MAX_DATAGRAM,
+    ):
+        super().__init__()
+        self.directory = directory
+        self.max_datagram = max_datagram
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._peers: List[str] = []
+        self._peers_at = 0.0
+        self._locks: dict = {}
+
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._sock.bind(self.path)
+
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        print(f"🔀 Realtime bus listening on {self.path}")
+
+    def claim(self, role: str) -> bool:
+        """
+        Every worker relays every broadcast, so a producer that runs in
+        each worker would reach each client once per worker. An flock on
+        <dir>/<role>.lock elects one holder; it is released when that
+        worker exits, so another worker can take over.
+        """
+        if role in self._locks:
+            return True
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, f"{role}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        self._locks[role] = fd
+        print(f"👑 Worker {os.getpid()} holds '{role}'")
+        return True
+
+    async def stop(self) -> None:
+        for fd in self._locks.values():
+            os.close(fd)
+        self._locks.clear()
+
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())  # type: ignore
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _refresh_peers(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_at > self.PEER_REFRESH_SECONDS:
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                names = []
+            self._peers = [
+                os.path.join(self.directory, name)
+                for name in names
+                if name.endswith(".sock")
+                and os.path.join(self.directory, name) != self.path
+            ]
+            self._peers_at = now
+        return self._peers
+
+    def _datagrams(self, message: dict) -> List[bytes]:
+        """
+        message as one or more datagrams of at most max_datagram bytes.
+        A batch is halved until each part fits; anything else that does
+        not fit is dropped.
+        """
+        data = json.dumps(message, separators=(",", ":")).encode()
+        if len(data) <= self.max_datagram:
+            return [data]
+
+        samples = message.get("samples") or []
+        if message.get("type") != "batch" or len(samples) < 2:
+            self.dropped += 1
+            print(f"⚠️ Realtime bus message of {len(data)} bytes is too large to relay")
+            return []
+
+        half = len(samples) // 2
+        return (
+            self._datagrams({**message, "samples": samples[:half]})
+            + self._datagrams({**message, "samples": samples[half:]})
+        )
+
+    async def _send(self, peer: str, datagrams: List[bytes]) -> None:
+        for data in datagrams:
+            for attempt in range(self.SEND_RETRIES + 1):
+                if self._sock is None:
+                    return
+                try:
+                    self._sock.sendto(data, peer)
+                    break
+                except BlockingIOError:
+                    # Peer queue full; give its worker a moment to drain
+                    if attempt < self.SEND_RETRIES:
+                        await asyncio.sleep(0.001 * 2 ** attempt)
+            else:
+                self.dropped += 1
+                return
+
+    async def publish(self, message: dict) -> None:
+        self.published += 1
+
+        if self._sock is not None:
+            datagrams = self._datagrams(message)
+
+            for peer in list(self._refresh_peers()):
+                try:
+                    await self._send(peer, datagrams)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker is gone
+                    if peer in self._peers:
+                        self._peers.remove(peer)
+                    try:
+                        os.unlink(peer)
+                    except OSError:
+                        pass
+                except OSError as e:
+                    self.dropped += 1
+                    print(f"⚠️ Realtime bus send to {peer} failed:", repr(e))
+
+        await self._deliver(message)  # type: ignore
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data = self._sock.recv(1 << 20)  # type: ignore
+            except (BlockingIOError, AttributeError):
+                return
+
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+
+            self.received += 1
+            asyncio.ensure_future(self._deliver(message))  # type: ignore
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "path": self.path,
+            "peers": len(self._peers),
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+def create_bus(kind: str = REALTIME_BUS) -> BroadcastBus:
+    if kind == "unix":
+        return UnixSocketBus()
+    if kind != "inproc":
+        print(f"⚠️ Unknown REALTIME_BUS '{kind}', using inproc")
+    return InProcessBus()
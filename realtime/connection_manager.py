@@ -1,29 +1,463 @@
 # realtime/connection_manager.py
 from fastapi import WebSocket
-from typing import Set
+from typing import Dict, Iterable, List, Optional, Set, Union
+import asyncio
 import json
+import os
+import struct
+
+from data.history_cache import INVALIDATE, history_cache
+from realtime.binary_protocol import KIND_LIVE, KIND_SNAPSHOT, encode_samples
+from realtime.bus import BroadcastBus, InProcessBus
+from realtime.snapshot import SnapshotBuffer
+
+# Per-client outbound queue
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "256"))
+# "drop-oldest": discard the oldest queued frame when full
+# "disconnect": close the socket after REALTIME_MAX_OVERFLOWS overflows
+REALTIME_SLOW_POLICY = os.getenv("REALTIME_SLOW_POLICY", "drop-oldest")
+REALTIME_MAX_OVERFLOWS = int(os.getenv("REALTIME_MAX_OVERFLOWS", "50"))
+# Rate applied to new clients (0 = unlimited) and the highest a client may ask for
+REALTIME_DEFAULT_MAX_HZ = float(os.getenv("REALTIME_DEFAULT_MAX_HZ", "0"))
+REALTIME_MAX_HZ_CAP = float(os.getenv("REALTIME_MAX_HZ_CAP", "50"))
+
+try:
+    import orjson
+
+    def encode_message(message: dict) -> str:
+        return orjson.dumps(message).decode()
+except ImportError:  # optional speedup
+    def encode_message(message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"))
+
+# Wire formats a client can pick: JSON text, or binary frames with
+# float32 / float64 values (see realtime/binary_protocol.py)
+WIRE_FORMATS = {"json", "f32", "f64"}
+
+Payload = Union[str, bytes]
+
+
+class Frame:
+    """
+    One outgoing message, encoded lazily and at most once per wire format
+    no matter how many clients receive it. Only sample-carrying frames
+    have a binary form; everything else is always JSON.
+    """
+
+    def __init__(
+        self,
+        message: dict,
+        samples: Optional[List[dict]] = None,
+        kind: int = KIND_LIVE,
+    ):
+        self.message = message
+        self.samples = samples
+        self.kind = kind
+        self._encoded: Dict[str, Payload] = {}
+
+    def payload(self, wire: str = "json") -> Payload:
+        if self.samples is None:
+            wire = "json"
+
+        encoded = self._encoded.get(wire)
+        if encoded is None:
+            if wire == "json":
+                encoded = encode_message(self.message)
+            else:
+                try:
+                    encoded = encode_samples(
+                        self.samples, float64=(wire == "f64"), kind=self.kind  # type: ignore
+                    )
+                except (KeyError, TypeError, ValueError, OverflowError, struct.error):
+                    encoded = self.payload("json")
+            self._encoded[wire] = encoded
+
+        return encoded
+
+
+class ClientConnection:
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[Payload] = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        # None = every metric (the default until the client subscribes)
+        self.metrics: Optional[Set[str]] = None
+        self.wire = "json"
+        # Rate limiting: 0 = send every update as it arrives
+        self.min_interval = 0.0
+        self.latest: Dict[str, dict] = {}
+        self.ticker: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.overflows = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def coalesce(self, samples: List[dict]) -> None:
+        """
+        Keep only the newest sample per metric until the next tick.
+        """
+        for sample in samples:
+            metric = sample.get("metric")
+            if metric is None:
+                continue
+            if metric in self.latest:
+                self.coalesced += 1
+            self.latest[metric] = sample
+
+    def stats(self) -> dict:
+        return {
+            "client": str(self.websocket.client),
+            "metrics": sorted(self.metrics) if self.metrics is not None else "*",
+            "wire": self.wire,
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "overflows": self.overflows,
+            "max_hz": round(1 / self.min_interval, 2) if self.min_interval else None,
+            "coalesced": self.coalesced,
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+    """
+    Every socket gets a bounded outbound queue drained by its own writer
+    task, so broadcast() only enqueues and one stalled browser cannot
+    hold up the others (or the ingest path that called broadcast).
+
+    Clients receive every metric until they subscribe to specific ones;
+    a metric -> clients index keeps broadcast from touching sockets
+    that did not ask for the metric. A client may also cap its update
+    rate, in which case updates are coalesced to the latest value per
+    metric and sent as one batch frame per tick.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = REALTIME_QUEUE_SIZE,
+        slow_policy: str = REALTIME_SLOW_POLICY,
+        max_overflows: int = REALTIME_MAX_OVERFLOWS,
+    ):
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.queue_size = queue_size
+        self.slow_policy = slow_policy
+        self.max_overflows = max_overflows
+
+        self._wildcard: Set[ClientConnection] = set()
+        self._by_metric: Dict[str, Set[ClientConnection]] = {}
+
+        self.snapshots = SnapshotBuffer()
+
+        self.bus: BroadcastBus = InProcessBus()
+        self.bus.bind(self.deliver)
+
+    async def start_bus(self, bus: BroadcastBus) -> None:
+        """
+        Swap in a cross-worker bus (see realtime/bus.py). History cache
+        invalidations travel over it too.
+        """
+        await self.bus.stop()
+        bus.bind(self.deliver)
+        await bus.start()
+        self.bus = bus
+        history_cache.bind(None if isinstance(bus, InProcessBus) else bus.publish)
+
+    async def stop_bus(self) -> None:
+        history_cache.bind(None)
+        await self.bus.stop()
+        self.bus = InProcessBus()
+        self.bus.bind(self.deliver)
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, wire: str = "json"):
         await websocket.accept()
-        self.active_connections.add(websocket)
+        client = ClientConnection(websocket, self.queue_size)
+        if wire in WIRE_FORMATS:
+            client.wire = wire
+        client.writer = asyncio.create_task(self._writer(client))
+        self.active_connections[websocket] = client
+        self._wildcard.add(client)
+
+        # Prime the client with recent points before any live update
+        samples = self.snapshots.snapshot()
+        self._send(client, Frame(
+            {"type": "snapshot", "samples": samples}, samples, KIND_SNAPSHOT
+        ))
+        if REALTIME_DEFAULT_MAX_HZ > 0:
+            self.set_rate(websocket, REALTIME_DEFAULT_MAX_HZ)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return
+        self._unindex(client)
+        for task in (client.writer, client.ticker):
+            if task is not None:
+                task.cancel()
+
+    # ----------------------
+    # Subscriptions
+    # ----------------------
+
+    def _unindex(self, client: ClientConnection) -> None:
+        self._wildcard.discard(client)
+        for metric in client.metrics or ():
+            sockets = self._by_metric.get(metric)
+            if sockets is not None:
+                sockets.discard(client)
+                if not sockets:
+                    del self._by_metric[metric]
+
+    def _set_metrics(self, client: ClientConnection, metrics: Optional[Set[str]]) -> None:
+        self._unindex(client)
+        client.metrics = metrics
+        if metrics is None:
+            self._wildcard.add(client)
+            return
+        for metric in metrics:
+            self._by_metric.setdefault(metric, set()).add(client)
+
+    def subscribe(self, websocket: WebSocket, metrics: Iterable[str]) -> None:
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        metrics = set(metrics)
+        if "*" in metrics:
+            self._set_metrics(client, None)
+        else:
+            self._set_metrics(client, (client.metrics or set()) | metrics)
+
+    def unsubscribe(self, websocket: WebSocket, metrics: Iterable[str]) -> None:
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        metrics = set(metrics)
+        if "*" in metrics or client.metrics is None:
+            # Unsubscribing from the implicit "everything" leaves nothing
+            self._set_metrics(client, set())
+        else:
+            self._set_metrics(client, client.metrics - metrics)
+
+    async def handle_message(self, websocket: WebSocket, text: str) -> None:
+        """
+        Client control messages:
+            {"action": "subscribe",   "metrics": ["lux"]}
+            {"action": "unsubscribe", "metrics": ["rt"]}
+            {"action": "rate",        "max_hz": 2}
+            {"action": "protocol",    "format": "binary", "precision": "float32"}
+        "*" stands for every metric. Anything else is ignored.
+        """
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+
+        action = data.get("action")
+        metrics = data.get("metrics") or []
+        if isinstance(metrics, str):
+            metrics = [metrics]
+        metrics = [m for m in metrics if isinstance(m, str)]
+
+        if action == "protocol":
+            client = self.active_connections.get(websocket)
+            if client is None:
+                return
+            if data.get("format") == "binary":
+                client.wire = "f64" if data.get("precision") == "float64" else "f32"
+            else:
+                client.wire = "json"
+            self._enqueue(client, encode_message({"type": "protocol", "wire": client.wire}))
+            return
+
+        if action == "rate":
+            max_hz = data.get("max_hz")
+            if max_hz is not None and not isinstance(max_hz, (int, float)):
+                return
+            self.set_rate(websocket, max_hz)
+            return
+
+        if action == "subscribe":
+            self.subscribe(websocket, metrics)
+        elif action == "unsubscribe":
+            self.unsubscribe(websocket, metrics or ["*"])
+        else:
+            return
+
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            self._enqueue(client, encode_message({
+                "type": "subscriptions",
+                "metrics": sorted(client.metrics) if client.metrics is not None else "*",
+            }))
+
+    # ----------------------
+    # Fan-out
+    # ----------------------
 
     async def broadcast(self, message: dict):
-        dead = set()
-        for ws in self.active_connections:
+        """
+        Publish to every worker; each one fans out via deliver().
+        """
+        await self.bus.publish(message)
+
+    async def deliver(self, message: dict):
+        """
+        Fan a message out to this process's sockets.
+        """
+        if message.get("type") == INVALIDATE:
+            history_cache.apply_remote(message)
+            return
+
+        if message.get("type") == "batch":
+            self.snapshots.record(message.get("samples") or [])
+        elif "metric" in message:
+            self.snapshots.record([message])
+
+        if not self.active_connections:
+            return
+
+        if message.get("type") == "batch":
+            self._broadcast_batch(message)
+            return
+
+        metric = message.get("metric")
+        if metric is None:
+            recipients: Iterable[ClientConnection] = list(self.active_connections.values())
+        else:
+            recipients = self._wildcard | self._by_metric.get(metric, set())
+
+        # Encoded once per wire format; every queue shares the payload
+        frame = Frame(message, [message] if metric is not None else None)
+
+        for client in recipients:
+            if metric is not None and client.min_interval:
+                client.coalesce([message])
+                continue
+            self._send(client, frame)
+
+    def _broadcast_batch(self, message: dict) -> None:
+        samples: List[dict] = message.get("samples") or []
+        metrics = {sample.get("metric") for sample in samples}
+
+        # Wildcard clients share the full frame
+        frame = Frame(message, samples)
+        for client in list(self._wildcard):
+            if client.min_interval:
+                client.coalesce(samples)
+                continue
+            self._send(client, frame)
+
+        # Subscribed clients get only their metrics, one encode per
+        # distinct subscription set
+        by_subscription: Dict[frozenset, List[ClientConnection]] = {}
+        for metric in metrics:
+            for client in self._by_metric.get(metric, ()):  # type: ignore
+                key = frozenset(client.metrics or ())
+                group = by_subscription.setdefault(key, [])
+                if client not in group:
+                    group.append(client)
+
+        for wanted, clients in by_subscription.items():
+            filtered = [s for s in samples if s.get("metric") in wanted]
+            frame = Frame({**message, "samples": filtered}, filtered)
+            for client in clients:
+                if client.min_interval:
+                    client.coalesce(filtered)
+                    continue
+                self._send(client, frame)
+
+    # ----------------------
+    # Rate limiting
+    # ----------------------
+
+    def set_rate(self, websocket: WebSocket, max_hz: Optional[float]) -> None:
+        """
+        Cap a client at max_hz frames per second. In between ticks only
+        the latest sample per metric is kept. None or 0 lifts the cap.
+        """
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+
+        if client.ticker is not None:
+            client.ticker.cancel()
+            client.ticker = None
+        self._flush_latest(client)
+
+        if not max_hz or max_hz <= 0:
+            client.min_interval = 0.0
+            return
+
+        client.min_interval = 1 / min(max_hz, REALTIME_MAX_HZ_CAP)
+        client.ticker = asyncio.create_task(self._ticker(client))
+
+    async def _ticker(self, client: ClientConnection) -> None:
+        while True:
+            await asyncio.sleep(client.min_interval)
+            self._flush_latest(client)
+
+    def _flush_latest(self, client: ClientConnection) -> None:
+        if not client.latest:
+            return
+        samples = list(client.latest.values())
+        client.latest.clear()
+        self._send(client, Frame({"type": "batch", "samples": samples}, samples))
+
+    def _send(self, client: ClientConnection, frame: Frame) -> None:
+        self._enqueue(client, frame.payload(client.wire))
+
+    def _enqueue(self, client: ClientConnection, payload: Payload) -> None:
+        try:
+            client.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            client.overflows += 1
+
+            if self.slow_policy == "disconnect":
+                if client.overflows >= self.max_overflows:
+                    print(f"⚠️ Dropping slow websocket client {client.websocket.client}")
+                    self.disconnect(client.websocket)
+                    asyncio.create_task(self._close(client.websocket))
+                else:
+                    client.dropped += 1
+                return
+
+            # drop-oldest
+            client.queue.get_nowait()
+            client.dropped += 1
+            client.queue.put_nowait(payload)
+
+        client.max_depth = max(client.max_depth, client.queue.qsize())
+
+    async def _writer(self, client: ClientConnection) -> None:
+        while True:
+            payload = await client.queue.get()
             try:
-                await ws.send_text(json.dumps(message))
+                if isinstance(payload, bytes):
+                    await client.websocket.send_bytes(payload)
+                else:
+                    await client.websocket.send_text(payload)
+                client.sent += 1
             except Exception:
-                dead.add(ws)
+                if self.active_connections.get(client.websocket) is client:
+                    self.disconnect(client.websocket)
+                return
+
+    async def _close(self, websocket: WebSocket) -> None:
+        try:
+            await websocket.close(code=1013)  # try again later
+        except Exception:
+            pass
 
-        for ws in dead:
-            self.disconnect(ws)
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.active_connections),
+            "queue_size": self.queue_size,
+            "slow_policy": self.slow_policy,
+            "bus": self.bus.stats(),
+            "clients": [c.stats() for c in self.active_connections.values()],
+        }
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -0,0 +1,36 @@
+# realtime/snapshot.py
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+import os
+
+REALTIME_SNAPSHOT_SIZE = int(os.getenv("REALTIME_SNAPSHOT_SIZE", "100"))
+
+
+class SnapshotBuffer:
+    """
+    Last N realtime samples per metric, kept in memory so a new
+    WebSocket client can be primed without querying Mongo.
+    """
+
+    def __init__(self, size: int = REALTIME_SNAPSHOT_SIZE):
+        self.size = size
+        self._points: Dict[str, Deque[dict]] = {}
+
+    def record(self, samples: Iterable[dict]) -> None:
+        if self.size <= 0:
+            return
+        for sample in samples:
+            metric = sample.get("metric")
+            if metric is None:
+                continue
+            points = self._points.get(metric)
+            if points is None:
+                points = self._points[metric] = deque(maxlen=self.size)
+            points.append(sample)
+
+    def snapshot(self, metrics: Optional[Iterable[str]] = None) -> List[dict]:
+        wanted = self._points.keys() if metrics is None else metrics
+        samples: List[dict] = []
+        for metric in wanted:
+            samples.extend(self._points.get(metric, ()))
+        return samples
@@ -1,9 +1,16 @@
 # repository/HistoryRepositoryImpl.py
+import os
 from datetime import datetime
+from bson import ObjectId
+from data.metric_store import metric_store
 from data.mongo import mongo
-from model.model import HistoryRecord
+from data.rollups import ROLLUPS, truncate
+from model.model import HistoryBucket, HistoryRecord
 from repository.HistoryRepositoryInterface import HistoryRepositoryInterface
 
+# Documents per getMore while streaming an export
+EXPORT_BATCH_SIZE = int(os.getenv("HISTORY_EXPORT_BATCH_SIZE", "5000"))
+
 
 class HistoryRepositoryImpl(HistoryRepositoryInterface):
 
@@ -17,15 +24,9 @@ class HistoryRepositoryImpl(HistoryRepositoryInterface):
         if mongo.client is None:
             raise RuntimeError("MongoDB client not initialized")
 
-        collection = mongo.client["IoT_"][metric]
+        collection = metric_store.collection(metric)
 
-        query: dict = {}
-        if start or end:
-            query["timestamp"] = {}
-            if start:
-                query["timestamp"]["$gte"] = start
-            if end:
-                query["timestamp"]["$lte"] = end
+        query = self._match(metric, start, end)
 
         cursor = (
             collection
@@ -37,27 +38,314 @@ class HistoryRepositoryImpl(HistoryRepositoryInterface):
         results = []
 
         async for doc in cursor:
-            # 🔑 FIX HERE
-            timestamp_local = None
-            raw = doc.get("timestamp_local")
+            results.append(self._to_record(metric, doc))
+
+        return results
+
+    async def get_history_columns(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 100,
+    ):
+        """
+        Same rows as get_history() as two parallel lists, built straight
+        from a {timestamp, value} projection without per-row models.
+        """
+        if mongo.client is None:
+            raise RuntimeError("MongoDB client not initialized")
+
+        collection = metric_store.collection(metric)
+
+        cursor = (
+            collection
+            .find(
+                self._match(metric, start, end),
+                {"_id": 0, "timestamp": 1, "value": 1},
+            )
+            .sort("timestamp", -1)
+            .limit(limit)
+        )
+
+        return self._to_columns([doc async for doc in cursor])
+
+    @staticmethod
+    def _to_columns(docs: list[dict]) -> dict:
+        ts = []
+        values = []
+        for doc in docs:
+            timestamp = doc["timestamp"]
+            # Legacy rows may hold ISO strings; pass them through as-is
+            ts.append(timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp)
+            values.append(float(doc["value"]))
+        return {"ts": ts, "value": values}
+
+    async def get_history_page(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 100,
+        after: tuple[datetime, ObjectId] | None = None,
+    ):
+        """
+        Keyset page ordered by (timestamp, _id) descending. `after` is the
+        key of the last row of the previous page; the next page starts with
+        an index seek below it instead of skipping rows.
+        """
+        if mongo.client is None:
+            raise RuntimeError("MongoDB client not initialized")
+
+        collection = metric_store.collection(metric)
+
+        query = self._match(metric, start, end)
+        if after is not None:
+            ts, oid = after
+            seek = {
+                "$or": [
+                    {"timestamp": {"$lt": ts}},
+                    {"timestamp": ts, "_id": {"$lt": oid}},
+                ]
+            }
+            query = {"$and": [query, seek]} if query else seek
+
+        cursor = (
+            collection
+            .find(query)
+            .sort([("timestamp", -1), ("_id", -1)])
+            .limit(limit + 1)
+        )
+
+        docs = [doc async for doc in cursor]
+
+        next_key = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_key = (docs[-1]["timestamp"], docs[-1]["_id"])
+
+        return [self._to_record(metric, doc) for doc in docs], next_key
+
+    async def iter_history(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+    ):
+        """
+        Stream raw {timestamp, value} docs oldest first, one batch in
+        memory at a time.
+        """
+        if mongo.client is None:
+            raise RuntimeError("MongoDB client not initialized")
+
+        collection = metric_store.collection(metric)
+
+        cursor = (
+            collection
+            .find(
+                self._match(metric, start, end),
+                {"_id": 0, "timestamp": 1, "value": 1},
+            )
+            .sort("timestamp", 1)
+            .batch_size(EXPORT_BATCH_SIZE)
+        )
+
+        async with cursor:
+            async for doc in cursor:
+                yield doc
+
+    @staticmethod
+    def _to_record(metric: str, doc: dict) -> HistoryRecord:
+        # 🔑 FIX HERE
+        timestamp_local = None
+        raw = doc.get("timestamp_local")
+
+        if isinstance(raw, datetime):
+            timestamp_local = raw
+        elif isinstance(raw, str):
+            timestamp_local = datetime.fromisoformat(raw)
+
+        return HistoryRecord(
+            id=str(doc["_id"]),
+            metric=metric,
+            value=float(doc["value"]),
+            timestamp=doc["timestamp"]
+            if isinstance(doc["timestamp"], datetime)
+            else datetime.fromisoformat(
+                doc["timestamp"].replace("Z", "+00:00")
+            ),
+            timestamp_local=timestamp_local,
+        )
+
+    async def aggregate_history(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        unit: str,
+        bin_size: int,
+        fns: list[str],
+    ):
+        if mongo.client is None:
+            raise RuntimeError("MongoDB client not initialized")
+
+        collection = metric_store.collection(metric)
+
+        accumulators = {
+            "avg": {"$avg": "$value"},
+            "min": {"$min": "$value"},
+            "max": {"$max": "$value"},
+            "count": {"$sum": 1},
+        }
+
+        pipeline = [
+            {"$match": self._match(metric, start, end)},
+            {
+                "$group": {
+                    "_id": {
+                        "$dateTrunc": {
+                            "date": "$timestamp",
+                            "unit": unit,
+                            "binSize": bin_size,
+                        }
+                    },
+                    **{fn: accumulators[fn] for fn in fns},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
+
+        results = []
+
+        async for doc in await collection.aggregate(pipeline):
+            results.append(
+                HistoryBucket(
+                    timestamp=doc["_id"],
+                    **{fn: doc.get(fn) for fn in fns},
+                )
+            )
+
+        return results
+
+    async def aggregate_rollup(
+        self,
+        metric: str,
+        rollup: str,
+        start: datetime | None,
+        end: datetime | None,
+        unit: str,
+        bin_size: int,
+        fns: list[str],
+    ):
+        """
+        Same buckets as aggregate_history(), regrouped from a rollup
+        collection. Edge buckets cover whole rollup buckets.
+        """
+        if mongo.client is None:
+            raise RuntimeError("MongoDB client not initialized")
+
+        collection = metric_store.db[rollup]
+        rollup_unit, _ = ROLLUPS[rollup]
+
+        match: dict = {"metric": metric}
+        if start or end:
+            match["bucket"] = {}
+            if start:
+                match["bucket"]["$gte"] = truncate(start, rollup_unit)
+            if end:
+                match["bucket"]["$lte"] = end
+
+        accumulators = {
+            "avg": None,  # derived from sum/count below
+            "min": {"$min": "$min"},
+            "max": {"$max": "$max"},
+            "count": {"$sum": "$count"},
+        }
 
-            if isinstance(raw, datetime):
-                timestamp_local = raw
-            elif isinstance(raw, str):
-                timestamp_local = datetime.fromisoformat(raw)
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {
+                        "$dateTrunc": {
+                            "date": "$bucket",
+                            "unit": unit,
+                            "binSize": bin_size,
+                        }
+                    },
+                    "_count": {"$sum": "$count"},
+                    "_sum": {"$sum": "$sum"},
+                    **{fn: accumulators[fn] for fn in fns if accumulators[fn]},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
 
+        results = []
+
+        async for doc in await collection.aggregate(pipeline):
+            if "avg" in fns:
+                doc["avg"] = doc["_sum"] / doc["_count"] if doc["_count"] else None
             results.append(
-                HistoryRecord(
-                    id=str(doc["_id"]),
-                    metric=metric,
-                    value=float(doc["value"]),
-                    timestamp=doc["timestamp"]
-                    if isinstance(doc["timestamp"], datetime)
-                    else datetime.fromisoformat(
-                        doc["timestamp"].replace("Z", "+00:00")
-                    ),
-                    timestamp_local=timestamp_local,
+                HistoryBucket(
+                    timestamp=doc["_id"],
+                    **{fn: doc.get(fn) for fn in fns},
                 )
             )
 
-        return results
\ No newline at end of file
+        return results
+
+    async def last_values(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        step_ms: int,
+    ):
+        """
+        Last sample value per epoch-aligned step, as (bucket, value)
+        pairs in time order.
+        """
+        if mongo.client is None:
+            raise RuntimeError("MongoDB client not initialized")
+
+        collection = metric_store.collection(metric)
+
+        pipeline = [
+            {"$match": self._match(metric, start, end)},
+            {"$sort": {"timestamp": 1}},
+            {
+                "$group": {
+                    # Floor to a multiple of step since the epoch
+                    "_id": {
+                        "$subtract": [
+                            "$timestamp",
+                            {"$mod": [{"$toLong": "$timestamp"}, step_ms]},
+                        ]
+                    },
+                    "value": {"$last": "$value"},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
+
+        return [
+            (doc["_id"], float(doc["value"]))
+            async for doc in await collection.aggregate(pipeline)
+        ]
+
+    @classmethod
+    def _match(cls, metric: str, start: datetime | None, end: datetime | None) -> dict:
+        return metric_store.match(metric, cls._time_range(start, end))
+
+    @staticmethod
+    def _time_range(start: datetime | None, end: datetime | None) -> dict:
+        query: dict = {}
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lte"] = end
+        return query
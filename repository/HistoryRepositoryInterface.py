@@ -1,9 +1,11 @@
 # repository/HistoryRepositoryInterface.py
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 
-from model.model import HistoryRecord
+from bson import ObjectId
+
+from model.model import HistoryBucket, HistoryRecord
 class HistoryRepositoryInterface(ABC):
 
     @abstractmethod
@@ -14,4 +16,69 @@ class HistoryRepositoryInterface(ABC):
         end: datetime | None,
         limit: int = 100,
     ) -> List[HistoryRecord]:
-        ...
\ No newline at end of file
+        ...
+
+    @abstractmethod
+    async def get_history_columns(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 100,
+    ) -> dict:
+        ...
+
+    @abstractmethod
+    async def get_history_page(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, ObjectId]] = None,
+    ) -> Tuple[List[HistoryRecord], Optional[Tuple[datetime, ObjectId]]]:
+        ...
+
+    @abstractmethod
+    def iter_history(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> AsyncIterator[dict]:
+        ...
+
+    @abstractmethod
+    async def aggregate_history(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        unit: str,
+        bin_size: int,
+        fns: List[str],
+    ) -> List[HistoryBucket]:
+        ...
+
+    @abstractmethod
+    async def aggregate_rollup(
+        self,
+        metric: str,
+        rollup: str,
+        start: datetime | None,
+        end: datetime | None,
+        unit: str,
+        bin_size: int,
+        fns: List[str],
+    ) -> List[HistoryBucket]:
+        ...
+
+    @abstractmethod
+    async def last_values(
+        self,
+        metric: str,
+        start: datetime | None,
+        end: datetime | None,
+        step_ms: int,
+    ) -> List[Tuple[datetime, float]]:
+        ...
@@ -1,6 +1,90 @@
 # service/HistoryService.py
+import asyncio
+import base64
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from typing import AsyncIterator
+from data.history_cache import history_cache
+from data.rollups import pick_rollup, rollups
+from helper.timeutils import ensure_utc
+from model.model import HistoryPage
 from repository.HistoryRepositoryInterface import HistoryRepositoryInterface
 
+# bucket name -> ($dateTrunc unit, binSize)
+BUCKETS = {
+    "1m": ("minute", 1),
+    "5m": ("minute", 5),
+    "1h": ("hour", 1),
+}
+
+AGGREGATE_FUNCTIONS = ("avg", "min", "max", "count")
+
+# Window used when an aggregate request has no start
+DEFAULT_AGGREGATE_WINDOW = timedelta(days=1)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows joined into one chunk of the streamed response
+EXPORT_CHUNK_ROWS = int(os.getenv("HISTORY_EXPORT_CHUNK_ROWS", "1000"))
+
+
+STEP_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+FILL_MODES = ("locf", "null")
+
+# Upper bound on rows of an aligned multi-metric response
+MAX_GRID_POINTS = int(os.getenv("HISTORY_MAX_GRID_POINTS", "10000"))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_step(step: str) -> timedelta:
+    match = re.fullmatch(r"(\d+)([smhd])", step.strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid step '{step}', expected e.g. 30s, 5m, 1h")
+    return timedelta(seconds=int(match.group(1)) * STEP_UNITS[match.group(2)])
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return ensure_utc(dt).replace(tzinfo=None)
+
+
+def encode_cursor(key: tuple[datetime, ObjectId]) -> str:
+    ts, oid = key
+    raw = f"{ts.isoformat()}|{oid}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, oid = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(ts), ObjectId(oid)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _iso(timestamp) -> str:
+    return timestamp.isoformat() if isinstance(timestamp, datetime) else str(timestamp)
+
+
+def _ndjson_row(doc: dict) -> str:
+    return json.dumps(
+        {"timestamp": _iso(doc["timestamp"]), "value": float(doc["value"])},
+        separators=(",", ":"),
+    ) + "\n"
+
+
+def _csv_row(doc: dict) -> str:
+    return f"{_iso(doc['timestamp'])},{float(doc['value'])!r}\n"
+
+
 class HistoryService:
     def __init__(self, repo: HistoryRepositoryInterface):
         self.repo = repo
@@ -12,4 +96,154 @@ class HistoryService:
         end=None,
         limit: int = 100,
     ):
-        return await self.repo.get_history(metric, start, end, limit)
\ No newline at end of file
+        return await history_cache.get_or_load(
+            metric, ("rows", start, end, limit), start, end,
+            lambda: self.repo.get_history(metric, start, end, limit),
+        )
+
+    async def get_metric_history_columns(
+        self,
+        metric: str,
+        start=None,
+        end=None,
+        limit: int = 100,
+    ) -> dict:
+        return await history_cache.get_or_load(
+            metric, ("columns", start, end, limit), start, end,
+            lambda: self.repo.get_history_columns(metric, start, end, limit),
+        )
+
+    async def get_metric_history_page(
+        self,
+        metric: str,
+        start=None,
+        end=None,
+        limit: int = 100,
+        cursor: str | None = None,
+    ) -> HistoryPage:
+        after = decode_cursor(cursor) if cursor else None
+        items, next_key = await self.repo.get_history_page(
+            metric, start, end, limit, after
+        )
+        return HistoryPage(
+            items=items,
+            next_cursor=encode_cursor(next_key) if next_key else None,
+        )
+
+    async def get_metric_aggregate(
+        self,
+        metric: str,
+        bucket: str,
+        fns: list[str],
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ):
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}'")
+
+        unknown = [fn for fn in fns if fn not in AGGREGATE_FUNCTIONS]
+        if unknown or not fns:
+            raise ValueError(f"Unknown aggregate function(s): {', '.join(unknown) or '(none)'}")
+
+        if start is None:
+            start = (end or datetime.now(timezone.utc)) - DEFAULT_AGGREGATE_WINDOW
+
+        unit, bin_size = BUCKETS[bucket]
+
+        # Coarsest pre-aggregated rollup that still resolves the bucket,
+        # once it has been rebuilt from the raw samples
+        rollup = pick_rollup(unit, bin_size)
+        if rollup and await rollups.ready(metric):
+            return await self.repo.aggregate_rollup(
+                metric, rollup, start, end, unit, bin_size, fns
+            )
+
+        return await self.repo.aggregate_history(
+            metric, start, end, unit, bin_size, fns
+        )
+
+    def export_metric_history(
+        self,
+        metric: str,
+        fmt: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Oldest first, as text chunks of EXPORT_CHUNK_ROWS rows each.
+        Raises ValueError before streaming starts on an unknown format.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'")
+
+        row = _csv_row if fmt == "csv" else _ndjson_row
+
+        async def chunks():
+            if fmt == "csv":
+                yield "timestamp,value\n"
+
+            lines = []
+            async for doc in self.repo.iter_history(metric, start, end):
+                lines.append(row(doc))
+                if len(lines) >= EXPORT_CHUNK_ROWS:
+                    yield "".join(lines)
+                    lines = []
+
+            if lines:
+                yield "".join(lines)
+
+        return chunks()
+
+    async def get_aligned_history(
+        self,
+        metrics: list[str],
+        step: str,
+        fill: str = "locf",
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> dict:
+        """
+        Last value of each metric per step on one shared, epoch-aligned
+        grid: {"ts": [...], "series": {metric: [...]}}. Gaps carry the
+        previous value forward (locf) or stay null.
+        """
+        if fill not in FILL_MODES:
+            raise ValueError(f"Unknown fill '{fill}'")
+
+        delta = parse_step(step)
+        end = _naive_utc(end or datetime.now(timezone.utc))
+        start = _naive_utc(start) if start else end - DEFAULT_AGGREGATE_WINDOW
+        if start > end:
+            raise ValueError("start must be before end")
+
+        first = start - (start - _EPOCH) % delta
+        points = (end - first) // delta + 1
+        if points > MAX_GRID_POINTS:
+            raise ValueError(
+                f"{points} steps requested, at most {MAX_GRID_POINTS}; use a larger step"
+            )
+
+        step_ms = delta // timedelta(milliseconds=1)
+        results = await asyncio.gather(*(
+            self.repo.last_values(metric, start, end, step_ms)
+            for metric in metrics
+        ))
+
+        grid = [first + i * delta for i in range(points)]
+        series = {}
+        for metric, pairs in zip(metrics, results):
+            by_bucket = dict(pairs)
+            column = []
+            last = None
+            for ts in grid:
+                value = by_bucket.get(ts)
+                if value is None and fill == "locf":
+                    value = last
+                column.append(value)
+                last = value
+            series[metric] = column
+
+        return {
+            "ts": [ts.isoformat() for ts in grid],
+            "series": series,
+        }
@@ -0,0 +1,226 @@
+# tests/test_backfill.py
+"""
+Gateway catch-up backfill, against a local stub of Adafruit's /data.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("ADAFRUIT_USERNAME", "tester")
+os.environ.setdefault("ADAFRUIT_KEY", "secret-key")
+os.environ.setdefault("ADAFRUIT_FEEDS", "rt")
+
+import pytest
+
+import gateway.adafruit_gateway as gw
+from data.history_cache import HistoryCache
+from gateway.watermarks import WatermarkCache
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class StubData(BaseHTTPRequestHandler):
+    """
+    /<user>/feeds/<feed>/data: points with start_time <= created_at <=
+    end_time, newest first, at most limit of them.
+    """
+    protocol_version = "HTTP/1.1"
+    points = []
+    seen = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        start = datetime.fromisoformat(params["start_time"])
+        end = datetime.fromisoformat(params["end_time"])
+        StubData.seen.append((start, end))
+
+        page = [
+            {"value": str(value), "created_at": ts.isoformat()}
+            for ts, value in sorted(StubData.points, reverse=True)
+            if start <= ts <= end
+        ][:int(params["limit"])]
+
+        body = json.dumps(page).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeStore:
+    """
+    Just enough of MetricStore for insert_backfill_page().
+    """
+
+    def __init__(self):
+        self.docs = []
+
+    def match(self, metric, query):
+        return query
+
+    def collection(self, metric):
+        return self
+
+    def find(self, query, projection=None):
+        bounds = query["timestamp"]
+        matching = [
+            doc for doc in self.docs
+            if bounds["$gte"] <= doc["timestamp"] <= bounds["$lte"]
+        ]
+
+        async def cursor():
+            for doc in matching:
+                yield doc
+        return cursor()
+
+    async def insert_many(self, metric, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+class RecordingWatermarks(WatermarkCache):
+    def __init__(self):
+        super().__init__()
+        self.history = []
+
+    def set(self, metric, timestamp):
+        super().set(metric, timestamp)
+        self.history.append(timestamp)
+
+
+class Noop:
+    async def ensure_metric(self, metric):
+        pass
+
+    async def apply(self, metric, docs):
+        pass
+
+    async def broadcast(self, message):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    StubData.points = []
+    StubData.seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubData)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    store = FakeStore()
+    watermarks = RecordingWatermarks()
+
+    monkeypatch.setattr(gw, "BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(gw, "_client", None)
+    monkeypatch.setattr(gw, "metric_store", store)
+    monkeypatch.setattr(gw, "watermarks", watermarks)
+    monkeypatch.setattr(gw, "history_cache", HistoryCache())
+    monkeypatch.setattr(gw, "index_manager", Noop())
+    monkeypatch.setattr(gw, "rollups", Noop())
+    monkeypatch.setattr(gw, "manager", Noop())
+
+    yield store, watermarks
+
+    server.shutdown()
+    server.server_close()
+
+
+def points_every(step: timedelta, count: int, end: datetime = NOW - timedelta(minutes=1)):
+    return [(end - step * i, float(i)) for i in reversed(range(count))]
+
+
+def run_backfill(times: int = 1):
+    async def run():
+        try:
+            return [await gw.backfill_feed("rt") for _ in range(times)]
+        finally:
+            await gw.close_http_client()
+    return asyncio.run(run())
+
+
+def stored(store):
+    return sorted(doc["timestamp"] for doc in store.docs)
+
+
+def test_walks_oldest_first_moving_the_watermark_per_window(stub, monkeypatch):
+    store, watermarks = stub
+    monkeypatch.setattr(gw, "BACKFILL_WINDOW", 3600)
+
+    StubData.points = points_every(timedelta(minutes=1), 180)
+    oldest = StubData.points[0][0]
+    watermarks.set("rt", oldest - timedelta(seconds=1))
+    watermarks.history.clear()
+
+    assert run_backfill() == [True]
+
+    starts = [start for start, _ in StubData.seen]
+    assert starts == sorted(starts)
+    assert len(starts) > 1  # 3h of points, starting with 1h windows
+
+    # Moved after every window except a final one with nothing in it
+    assert watermarks.history == sorted(watermarks.history)
+    assert len(watermarks.history) >= len(starts) - 1
+    assert StubData.points[-1][0] <= watermarks.get("rt") < datetime.now(timezone.utc)
+
+    assert stored(store) == [ts for ts, _ in StubData.points]
+
+
+def test_resumes_after_max_pages(stub, monkeypatch):
+    store, watermarks = stub
+    monkeypatch.setattr(gw, "BACKFILL_WINDOW", 600)
+    monkeypatch.setattr(gw, "BACKFILL_MAX_PAGES", 3)
+    monkeypatch.setattr(gw, "BACKFILL_PAGE_SIZE", 1000)
+
+    StubData.points = points_every(timedelta(minutes=1), 180)
+    watermarks.set("rt", StubData.points[0][0] - timedelta(seconds=1))
+
+    first = run_backfill()
+    assert first == [False]
+    paused_at = watermarks.get("rt")
+    assert paused_at < StubData.points[-1][0]
+    assert stored(store) == [ts for ts, _ in StubData.points if ts <= paused_at]
+
+    # Later cycles pick up from the watermark until caught up
+    results = run_backfill(times=10)
+    assert True in results
+    assert stored(store) == [ts for ts, _ in StubData.points]
+
+
+def test_skips_points_already_stored(stub, monkeypatch):
+    store, watermarks = stub
+    monkeypatch.setattr(gw, "BACKFILL_WINDOW", 3600)
+
+    StubData.points = points_every(timedelta(minutes=1), 60)
+    # Stored, but the watermark never moved past them
+    store.docs = [
+        {"value": value, "timestamp": ts, "source": gw.SOURCE}
+        for ts, value in StubData.points[::2]
+    ]
+    watermarks.set("rt", StubData.points[0][0] - timedelta(seconds=1))
+
+    assert run_backfill() == [True]
+    assert stored(store) == [ts for ts, _ in StubData.points]
+
+
+def test_pages_through_a_window_denser_than_a_page(stub, monkeypatch):
+    store, watermarks = stub
+    monkeypatch.setattr(gw, "BACKFILL_WINDOW", 4)
+    monkeypatch.setattr(gw, "BACKFILL_PAGE_SIZE", 10)
+
+    # 25 points per second: a full page even in a one-second window
+    StubData.points = points_every(timedelta(milliseconds=40), 100)
+    watermarks.set("rt", StubData.points[0][0] - timedelta(seconds=1))
+
+    assert run_backfill() == [True]
+    # Splitting alone would stop at one second and skip the overflow
+    assert stored(store) == [ts for ts, _ in StubData.points]
@@ -0,0 +1,102 @@
+# tests/test_binary_protocol.py
+"""
+Binary realtime frames: round trip through the reference decoder and
+the cases that change the encoding or fall back to JSON.
+
+    python -m pytest -q tests
+"""
+import json
+import math
+import random
+import struct
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from realtime.binary_protocol import FLAG_FLOAT64, decode_samples, encode_samples
+from realtime.connection_manager import Frame
+
+
+def make_samples(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "metric": ("rt", "rh", "lux")[i % 3],
+            "value": round(rnd.uniform(0, 1000), 2),
+            "timestamp": (start + timedelta(milliseconds=333 * i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+def flags(frame: bytes) -> int:
+    return frame[3]
+
+
+@pytest.mark.parametrize("float64", [False, True])
+@pytest.mark.parametrize("n", [0, 1, 100, 1000])
+def test_round_trip(n, float64):
+    samples = make_samples(n)
+
+    decoded = decode_samples(encode_samples(samples, float64=float64))["samples"]
+
+    assert len(decoded) == len(samples)
+    for original, back in zip(samples, decoded):
+        assert back["metric"] == original["metric"]
+        assert back["timestamp"] == original["timestamp"]
+        if float64:
+            assert back["value"] == original["value"]
+        else:
+            assert math.isclose(back["value"], original["value"], rel_tol=1e-6)
+
+
+def test_value_beyond_float32_switches_to_float64():
+    samples = make_samples(3)
+    samples[1]["value"] = 1e300
+
+    frame = encode_samples(samples)
+
+    assert flags(frame) & FLAG_FLOAT64
+    assert decode_samples(frame)["samples"][1]["value"] == 1e300
+
+
+def test_non_finite_values_stay_float32():
+    samples = make_samples(2)
+    samples[0]["value"] = float("inf")
+
+    frame = encode_samples(samples)
+
+    assert not flags(frame) & FLAG_FLOAT64
+    assert decode_samples(frame)["samples"][0]["value"] == float("inf")
+
+
+def test_long_metric_name_is_rejected():
+    samples = make_samples(1)
+    samples[0]["metric"] = "m" * 256
+
+    with pytest.raises(ValueError):
+        encode_samples(samples)
+
+
+def test_frame_falls_back_to_json_when_binary_fails():
+    samples = make_samples(2)
+    samples[0]["metric"] = "m" * 256
+    message = {"type": "batch", "samples": samples}
+
+    frame = Frame(message, samples)
+    payload = frame.payload("f32")
+
+    assert isinstance(payload, str)
+    assert json.loads(payload) == message
+    assert frame.payload("json") == payload
+
+
+def test_frame_encodes_once_per_wire_format():
+    samples = make_samples(10)
+    frame = Frame({"type": "batch", "samples": samples}, samples)
+
+    binary = frame.payload("f64")
+
+    assert frame.payload("f64") is binary
+    assert struct.unpack_from("<2s", binary)[0] == b"IB"
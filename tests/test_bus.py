@@ -0,0 +1,130 @@
+# tests/test_bus.py
+"""
+UnixSocketBus across real worker processes on one host.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from realtime.bus import UnixSocketBus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A worker: binds its own bus in the shared directory, then reports
+# every sample it was delivered once nothing arrived for a while.
+WORKER = textwrap.dedent("""
+    import asyncio, json, sys
+    from realtime.bus import UnixSocketBus
+
+    async def main(directory):
+        samples = []
+        messages = []
+
+        async def deliver(message):
+            messages.append(message)
+            if message.get("type") == "batch":
+                samples.extend(message["samples"])
+            else:
+                samples.append(message)
+
+        bus = UnixSocketBus(directory)
+        bus.bind(deliver)
+        await bus.start()
+        print("ready", flush=True)
+
+        seen = -1
+        while seen != len(messages) or not messages:
+            seen = len(messages)
+            await asyncio.sleep(0.5)
+
+        await bus.stop()
+        print(json.dumps({"samples": samples, "datagrams": len(messages)}), flush=True)
+
+    asyncio.run(main(sys.argv[1]))
+""")
+
+
+def start_workers(directory, count):
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, str(directory)],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(count)
+    ]
+    for worker in workers:
+        # Skip the bus's own startup log line
+        while worker.stdout.readline().strip() != "ready":
+            assert worker.poll() is None
+    return workers
+
+
+def collect(workers):
+    reports = []
+    for worker in workers:
+        out, _ = worker.communicate(timeout=30)
+        reports.append(json.loads(out.strip().splitlines()[-1]))
+    return reports
+
+
+def publish(directory, messages):
+    delivered = []
+
+    async def run():
+        async def deliver(message):
+            delivered.append(message)
+
+        bus = UnixSocketBus(str(directory))
+        bus.bind(deliver)
+        await bus.start()
+        try:
+            for message in messages:
+                await bus.publish(message)
+        finally:
+            await bus.stop()
+        return bus
+
+    bus = asyncio.run(run())
+    return bus, delivered
+
+
+def test_every_worker_receives_every_message(tmp_path):
+    workers = start_workers(tmp_path, 3)
+
+    messages = [
+        {"metric": "rt", "value": float(i), "timestamp": f"2025-01-01T00:00:{i:02d}+00:00"}
+        for i in range(20)
+    ]
+    bus, delivered = publish(tmp_path, messages)
+
+    assert delivered == messages
+    assert bus.dropped == 0
+    for report in collect(workers):
+        assert report["samples"] == messages
+
+
+def test_large_batch_is_split_into_datagrams(tmp_path):
+    workers = start_workers(tmp_path, 2)
+
+    samples = [
+        {"metric": "rt", "value": i / 7, "timestamp": f"2025-01-01T00:00:00.{i:06d}+00:00"}
+        for i in range(20000)
+    ]
+    message = {"type": "batch", "samples": samples}
+    assert len(json.dumps(message)) > 1 << 20
+
+    bus, delivered = publish(tmp_path, [message])
+
+    # The publishing worker's own clients get the batch unsplit
+    assert delivered == [message]
+    assert bus.dropped == 0
+    for report in collect(workers):
+        assert report["samples"] == samples
+        assert report["datagrams"] > 1
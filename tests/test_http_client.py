@@ -0,0 +1,117 @@
+# tests/test_http_client.py
+"""
+The gateway's pooled Adafruit client, against a local stub server.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("ADAFRUIT_USERNAME", "tester")
+os.environ.setdefault("ADAFRUIT_KEY", "secret-key")
+os.environ.setdefault("ADAFRUIT_FEEDS", "rt")
+
+import pytest
+
+import gateway.adafruit_gateway as gw
+
+
+class StubAdafruit(BaseHTTPRequestHandler):
+    # Keep-alive needs HTTP/1.1 and a Content-Length on every response
+    protocol_version = "HTTP/1.1"
+    seen = []
+
+    def do_GET(self):
+        StubAdafruit.seen.append({
+            "path": self.path,
+            "key": self.headers.get("X-AIO-Key"),
+            "peer_port": self.client_address[1],
+        })
+        body = json.dumps({
+            "value": "21.5",
+            "created_at": "2025-01-01T00:00:00Z",
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    StubAdafruit.seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAdafruit)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(gw, "BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(gw, "ADAFRUIT_KEY", "secret-key")
+    monkeypatch.setattr(gw, "_client", None)
+    for key in ("requests", "errors"):
+        monkeypatch.setitem(gw.http_stats, key, 0)
+    for key in ("last_ms", "avg_ms", "max_ms"):
+        monkeypatch.setitem(gw.http_stats, key, 0.0)
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_polls_reuse_one_pooled_client(stub_server):
+    async def poll_three_times():
+        clients = []
+        try:
+            for _ in range(3):
+                data = await gw.fetch_latest("rt")
+                assert data["value"] == "21.5"
+                clients.append(gw.get_http_client())
+        finally:
+            await gw.close_http_client()
+        return clients
+
+    clients = asyncio.run(poll_three_times())
+
+    assert all(client is clients[0] for client in clients)
+
+    seen = StubAdafruit.seen
+    assert [r["path"] for r in seen] == ["/tester/feeds/rt/data/last"] * 3
+    # One TCP connection kept alive across all polls
+    assert len({r["peer_port"] for r in seen}) == 1
+
+
+def test_requests_carry_the_aio_key(stub_server):
+    async def poll():
+        try:
+            await gw.fetch_latest("rt")
+        finally:
+            await gw.close_http_client()
+
+    asyncio.run(poll())
+
+    assert StubAdafruit.seen[0]["key"] == "secret-key"
+
+
+def test_latency_is_recorded(stub_server):
+    async def poll():
+        try:
+            for _ in range(2):
+                await gw.fetch_latest("rt")
+        finally:
+            await gw.close_http_client()
+
+    asyncio.run(poll())
+
+    stats = gw.http_stats
+    assert stats["requests"] == 2
+    assert stats["errors"] == 0
+    assert stats["last_ms"] > 0
+    assert 0 < stats["avg_ms"] <= stats["max_ms"]
+    assert stats["http_version"] == "HTTP/1.1"
@@ -0,0 +1,115 @@
+# tools/migrate_timeseries.py
+"""
+Copy per-metric collections into the shared time-series collection.
+
+    MONGO_URI=mongodb://... python -m tools.migrate_timeseries [--metrics rt,rh] [--batch-size 5000]
+
+Streams each source collection oldest first and inserts in batches, so
+memory stays flat. Re-running resumes after the newest timestamp already
+migrated for each metric. Source collections are left untouched; switch
+the app over with METRIC_STORAGE=timeseries once the counts match.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from pymongo import AsyncMongoClient
+
+from data.indexes import RESERVED_COLLECTIONS, is_metric_collection
+from data.metric_store import META_FIELD, TIMESERIES_COLLECTION, MetricStore
+from data.mongo import mongo
+
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+async def migrate_metric(store: MetricStore, metric: str, batch_size: int) -> None:
+    target = store.collection(metric)
+    source = store.db[metric]
+
+    last = await target.find_one(
+        {f"{META_FIELD}.metric": metric},
+        {"timestamp": 1},
+        sort=[("timestamp", -1)],
+    )
+    query = {"timestamp": {"$gt": last["timestamp"]}} if last else {}
+    if last:
+        print(f"↪️ {metric}: resuming after {last['timestamp'].isoformat()}")
+
+    cursor = (
+        source
+        .find(query, {"_id": 0})
+        .sort("timestamp", 1)
+        .batch_size(batch_size)
+    )
+
+    copied = skipped = 0
+    started = time.perf_counter()
+    batch = []
+
+    async def flush():
+        nonlocal copied
+        await store.insert_many(metric, batch, ordered=False)
+        copied += len(batch)
+        batch.clear()
+
+    async with cursor:
+        async for doc in cursor:
+            ts = to_datetime(doc.get("timestamp"))
+            if ts is None or "value" not in doc:
+                skipped += 1
+                continue
+            doc["timestamp"] = ts
+            batch.append(doc)
+
+            if len(batch) >= batch_size:
+                await flush()
+                print(f"   {metric}: {copied} copied", end="\r")
+
+    if batch:
+        await flush()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {metric}: {copied} copied, {skipped} skipped in {elapsed:.1f}s")
+
+
+async def main(args) -> None:
+    mongo.client = AsyncMongoClient(args.uri)
+    store = MetricStore("timeseries")
+
+    try:
+        await store.ensure_timeseries_collection()
+
+        names = await store.db.list_collection_names()
+        if args.metrics:
+            metrics = [m for m in args.metrics.split(",") if m]
+        else:
+            metrics = sorted(n for n in names if is_metric_collection(n))
+
+        for metric in metrics:
+            if metric in RESERVED_COLLECTIONS or metric not in names:
+                print(f"⚠️ {metric}: no such metric collection, skipped")
+                continue
+            await migrate_metric(store, metric, args.batch_size)
+
+        print(f"🗜️ Done; samples are in '{TIMESERIES_COLLECTION}'")
+    finally:
+        await mongo.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI"), required=os.getenv("MONGO_URI") is None)
+    parser.add_argument("--metrics", default="", help="comma-separated; default: all")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
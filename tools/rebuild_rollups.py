@@ -0,0 +1,67 @@
+# tools/rebuild_rollups.py
+"""
+Recompute the minute/hour rollups from raw samples.
+
+    MONGO_URI=mongodb://... python -m tools.rebuild_rollups [--metrics rt,rh] [--since 2025-01-01] [--until 2025-02-01]
+
+Rollout: deploy with rollups enabled (live writes start maintaining
+them), wait until the next hour has started, then run this once. Until a
+metric has been rebuilt, /history/{metric}/aggregate keeps reading raw
+samples; the rebuild records a marker in rollup_state that switches it
+over. Run it again to repair buckets after a failed rollup update or
+after rollups were disabled for a while.
+
+By default only closed hours are rebuilt (--until defaults to the start
+of the current hour), so buckets still receiving live $inc updates are
+not overwritten.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+from pymongo import AsyncMongoClient
+
+from data.indexes import index_manager, is_metric_collection
+from data.metric_store import META_FIELD, metric_store
+from data.mongo import mongo
+from data.rollups import rollups, truncate
+
+
+async def list_metrics():
+    if metric_store.timeseries:
+        return sorted(await metric_store.collection("").distinct(f"{META_FIELD}.metric"))
+    names = await metric_store.db.list_collection_names()
+    return sorted(n for n in names if is_metric_collection(n))
+
+
+async def main(args) -> None:
+    mongo.client = AsyncMongoClient(args.uri)
+
+    since = truncate(datetime.fromisoformat(args.since), "hour") if args.since else None
+    until = truncate(
+        datetime.fromisoformat(args.until) if args.until else datetime.now(timezone.utc),
+        "hour",
+    )
+
+    try:
+        # $merge needs the unique (metric, bucket) indexes
+        await index_manager.ensure_startup()
+
+        metrics = [m for m in args.metrics.split(",") if m] or await list_metrics()
+        for metric in metrics:
+            started = time.perf_counter()
+            await rollups.rebuild(metric, since, until)
+            print(f"✅ {metric}: rollups rebuilt in {time.perf_counter() - started:.1f}s")
+    finally:
+        await mongo.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI"), required=os.getenv("MONGO_URI") is None)
+    parser.add_argument("--metrics", default="", help="comma-separated; default: all")
+    parser.add_argument("--since", default=None, help="ISO date; default: all history")
+    parser.add_argument("--until", default=None, help="ISO date; default: start of this hour")
+    asyncio.run(main(parser.parse_args()))